@@ -0,0 +1,57 @@
+# allocation budget of a steady-state gameplay frame: the player fires in place while bees stream past,
+# each frame is stepped and drawn under tracemalloc. exits 1 when a frame's transient peak or the
+# blocks held on to across the measured frames go over budget
+# usage: python benchmarks/allocations.py [frames]
+import os, sys, tracemalloc
+
+os.environ['PLATFORMER_HEADLESS'] = '1'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+from settings import *
+from main import Game
+from audio import VoiceManager
+
+WARMUP = 1200 # long enough for the pools and the bee population to level off
+FRAME_PEAK_BUDGET = 16 * 1024 # bytes allocated on top of the frame's starting memory at any point in the frame
+# memory blocks the measured frames may leave behind, per frame. the live bee count drifts a few hundred
+# blocks either way, a leak of one object a frame still ends far above it
+RETAINED_BUDGET = 0.5
+
+def frame(game, number):
+    # fires in place, turning around every second
+    inputs = INPUT_SHOOT | (INPUT_LEFT if number % 120 == 0 else INPUT_RIGHT if number % 120 == 60 else 0)
+    game.step(inputs, 1 / FRAMERATE)
+    game.state = 'game'
+    game.all_sprites.draw(game.player.rect.center, 0.5)
+
+def measure(frames):
+    game = Game(headless = True, seed = 0)
+    # the mixer's audio thread and tracemalloc's hooks do not mix, sound effects are left out
+    pygame.mixer.quit()
+    game.voices = VoiceManager(game.audio)
+    for number in range(WARMUP):
+        frame(game, number)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    peaks = []
+    for number in range(WARMUP, WARMUP + frames):
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        frame(game, number)
+        peaks.append(tracemalloc.get_traced_memory()[1] - start)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    # the peaks list and the snapshot itself are the only allocations of this script in the window
+    retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.traceback[0].filename != __file__)
+    return sorted(peaks), retained
+
+if __name__ == '__main__':
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    peaks, retained = measure(frames)
+    print(f'frame peak: p50 {peaks[len(peaks) // 2]}B  max {peaks[-1]}B  (budget {FRAME_PEAK_BUDGET}B)')
+    print(f'blocks retained after {frames} frames: {retained} (budget {RETAINED_BUDGET * frames:.0f})')
+    if peaks[-1] > FRAME_PEAK_BUDGET or retained > RETAINED_BUDGET * frames:
+        print('over the allocation budget')
+        sys.exit(1)
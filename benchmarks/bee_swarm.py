@@ -0,0 +1,44 @@
+# frame cost of sprite bees versus the numpy BeeSwarm with the player shooting; stepping continues after game over
+# usage: python benchmarks/bee_swarm.py [bees ...]
+import os, sys
+from time import perf_counter
+
+os.environ['PLATFORMER_HEADLESS'] = '1'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+from settings import * 
+from main import Game
+
+def populate(game, bees):
+    # bees start on screen and to the right of it, so most are alive, drawn and collision-tested every frame
+    left = int(game.player.rect.centerx - WINDOW_WIDTH / 2)
+    xs = RNG.choices(range(left, left + WINDOW_WIDTH * 4), k = bees)
+    ys = RNG.choices(range(0, game.level_height), k = bees)
+    if game.swarm:
+        game.swarm.spawn(bees, 0, (0, 0), (300, 500))
+        game.swarm.x[:bees], game.swarm.y[:bees] = xs, ys
+    else:
+        for pos in zip(xs, ys):
+            game.bee_pool.acquire(frames = game.bee_frames, pos = pos, groups = (game.all_sprites, game.enemy_sprites), speed = RNG.randint(300, 500), bounds = game.bee_bounds)
+
+def run(bees, swarm, frames = 120):
+    game = Game(headless = True, seed = 0, swarm = swarm)
+    game.bee_timer.deactivate()
+    populate(game, bees)
+    times = []
+    for frame in range(frames):
+        start = perf_counter()
+        game.step(INPUT_SHOOT, 1 / FRAMERATE)
+        game.display_surface.fill(BG_COLOR)
+        game.all_sprites.draw(game.player.rect.center)
+        times.append(perf_counter() - start)
+    times.sort()
+    alive = game.swarm.count if game.swarm else len(game.enemy_sprites)
+    print(f"{'swarm ' if swarm else 'sprites'} {bees:>6} bees: p50 {times[len(times) // 2] * 1000:7.2f}ms  p95 {times[int(len(times) * 0.95)] * 1000:7.2f}ms  ({alive} left)")
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or [500, 2000, 10000]
+    for bees in counts:
+        if bees <= 2000:
+            run(bees, swarm = False)
+        run(bees, swarm = True)
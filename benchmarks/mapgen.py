@@ -0,0 +1,53 @@
+# writes large TMX maps in the layout of data/maps/world.tmx: a floor, random platforms with worms, and decoration
+from os.path import abspath, join
+from random import Random
+
+ROOT = join(abspath(__file__).rsplit('benchmarks', 1)[0])
+TILESET = join(ROOT, 'data', 'tilesets', 'tilemap.tsx')
+GROUND, PLATFORM, DECORATION = 5, 14, (31, 32, 33, 34, 39)
+TILE = 64
+
+def generate(width, height, seed = 0):
+    rng = Random(seed)
+    main = [[0] * width for _ in range(height)]
+    decoration = [[0] * width for _ in range(height)]
+    worms = []
+
+    floor = height - 2
+    for x in range(width):
+        main[floor][x] = main[floor + 1][x] = GROUND
+
+    x = 12
+    while x < width - 10:
+        length = rng.randint(3, 9)
+        y = rng.randint(3, floor - 3)
+        for column in range(x, x + length):
+            main[y][column] = PLATFORM
+            if rng.random() < 0.2:
+                decoration[y - 1][column] = rng.choice(DECORATION)
+        if rng.random() < 0.5:
+            worms.append((x * TILE, (y - 1) * TILE, length * TILE, TILE))
+        x += length + rng.randint(2, 8)
+
+    player = (5 * TILE, (floor - 2) * TILE)
+    return main, decoration, player, worms
+
+def write_map(path, width, height, seed = 0):
+    main, decoration, player, worms = generate(width, height, seed)
+
+    def layer(layer_id, name, rows):
+        data = ',\n'.join(','.join(map(str, row)) for row in rows)
+        return f' <layer id="{layer_id}" name="{name}" width="{width}" height="{height}">\n  <data encoding="csv">\n{data}\n</data>\n </layer>\n'
+
+    objects = [f'  <object id="1" name="Player" x="{player[0]}" y="{player[1]}">\n   <point/>\n  </object>\n']
+    for index, (x, y, w, h) in enumerate(worms, start = 2):
+        objects.append(f'  <object id="{index}" name="Worm" x="{x}" y="{y}" width="{w}" height="{h}"/>\n')
+
+    with open(path, 'w') as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        file.write(f'<map version="1.10" orientation="orthogonal" renderorder="right-down" width="{width}" height="{height}" tilewidth="{TILE}" tileheight="{TILE}" infinite="0" nextlayerid="4" nextobjectid="{len(objects) + 1}">\n')
+        file.write(f' <tileset firstgid="1" source="{TILESET}"/>\n')
+        file.write(layer(1, 'Main', main))
+        file.write(layer(3, 'Decoration', decoration))
+        file.write(' <objectgroup id="2" name="Entities">\n' + ''.join(objects) + ' </objectgroup>\n</map>\n')
+    return path
@@ -0,0 +1,48 @@
+# checks the F3 toggle of a profiler that starts enabled, as PLATFORMER_PROFILE=1 starts it: one press shows
+# the overlay and keeps recording, a second hides it and recording carries on for F4 exports. exits 1 when not
+# usage: python benchmarks/profiler_toggle.py
+import os, sys
+
+os.environ['PLATFORMER_HEADLESS'] = '1'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+from settings import *
+from profiler import Profiler
+
+def frame(profiler, surface):
+    profiler.begin_frame()
+    profiler.mark('update')
+    profiler.draw(surface)
+    profiler.end_frame(((), (), ()))
+
+def check():
+    surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    profiler = Profiler(enabled = True)
+    failures = []
+
+    profiler.toggle()
+    frame(profiler, surface)
+    if not (profiler.show_overlay and profiler.enabled and profiler.overlay and profiler.frames):
+        failures.append('first F3 press did not show the overlay with recording on')
+
+    profiler.toggle()
+    recorded = len(profiler.frames)
+    frame(profiler, surface)
+    if profiler.show_overlay or not profiler.enabled or len(profiler.frames) != recorded + 1:
+        failures.append('second F3 press did not hide the overlay and keep recording')
+
+    # a profiler that starts off records only while its overlay is up
+    profiler = Profiler()
+    profiler.toggle()
+    profiler.toggle()
+    if profiler.enabled:
+        failures.append('hiding the overlay left a profiler that started off recording')
+    return failures
+
+if __name__ == '__main__':
+    failures = check()
+    for failure in failures:
+        print(failure)
+    print('profiler toggle ok' if not failures else f'{len(failures)} failures')
+    if failures:
+        sys.exit(1)
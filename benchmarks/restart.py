@@ -0,0 +1,37 @@
+# restart latency of Game.reset_game with a cold level cache (TMX parsed and compiled) versus a warm one
+# usage: python benchmarks/restart.py [repeats]
+import os, sys, tempfile
+from time import perf_counter
+
+os.environ['PLATFORMER_HEADLESS'] = '1'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+from settings import * 
+from main import Game
+from level import level_cache
+from mapgen import write_map
+
+def time_restarts(game, repeats, cold):
+    times = []
+    for _ in range(repeats):
+        if cold:
+            level_cache.clear()
+        start = perf_counter()
+        game.reset_game()
+        times.append(perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+def run(label, path, repeats):
+    game = Game(headless = True, seed = 0)
+    game.map_path = path
+    cold = time_restarts(game, max(repeats // 4, 1), cold = True)
+    warm = time_restarts(game, repeats, cold = False)
+    print(f'{label}: cold {cold:.1f}ms  warm {warm:.2f}ms  x{cold / warm:.0f}')
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    run('world.tmx', join('data', 'maps', 'world.tmx'), repeats)
+    with tempfile.TemporaryDirectory() as folder:
+        for width, height in ((400, 40), (2000, 60)):
+            run(f'generated {width}x{height}', write_map(join(folder, 'map.tmx'), width, height), repeats)
@@ -0,0 +1,44 @@
+# frame cost and resident world size while the player sweeps across generated maps of growing width;
+# with level streaming the sprite count and the baked chunks stay flat however wide the map
+# usage: python benchmarks/streaming.py [width ...]
+import os, sys, tempfile
+from time import perf_counter
+
+os.environ['PLATFORMER_HEADLESS'] = '1'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+from settings import * 
+from main import Game
+from mapgen import write_map
+
+def run(path, width, frames = 600):
+    game = Game(headless = True, seed = 0)
+    game.map_path = path
+    start = perf_counter()
+    game.reset_game()
+    load = perf_counter() - start
+
+    # the player is carried along the floor, fast enough to cross the whole map in the given frames
+    stride = max((width - 10) * TILE_SIZE // frames, 1)
+    times, most_sprites = [], 0
+    for frame in range(frames):
+        game.player.rect.x += stride
+        game.player.rect.bottom = (game.level_height // TILE_SIZE - 2) * TILE_SIZE
+        start = perf_counter()
+        game.step(0, 1 / FRAMERATE)
+        game.all_sprites.draw(game.player.rect.center)
+        times.append(perf_counter() - start)
+        most_sprites = max(most_sprites, len(game.all_sprites))
+    times.sort()
+
+    chunks = game.all_sprites.chunks.entries
+    megabytes = sum(chunk.get_size()[0] * chunk.get_size()[1] * chunk.get_bytesize() for chunk in chunks.values()) / 2 ** 20
+    worms = sum(name == 'Worm' for name, *_ in game.entities)
+    print(f'{width:>6} tiles wide: load {load * 1000:6.0f}ms  p50 {times[len(times) // 2] * 1000:6.2f}ms  p95 {times[int(len(times) * 0.95)] * 1000:6.2f}ms  '
+          f'sprites <= {most_sprites:>3}  worms {len(game.stream.active):>3}/{worms:<5}  chunks {len(chunks):>2} ({megabytes:.0f}MB)')
+
+if __name__ == '__main__':
+    widths = [int(arg) for arg in sys.argv[1:]] or [200, 1000, 5000]
+    with tempfile.TemporaryDirectory() as folder:
+        for width in widths:
+            run(write_map(join(folder, f'map{width}.tmx'), width, 40), width)
@@ -0,0 +1,186 @@
+# scripted gameplay scenarios under the dummy video driver, reporting frame time percentiles per phase,
+# python allocations and peak RSS, with an optional regression check against a stored baseline.
+# every scenario runs in its own process so peak RSS and the caches start cold
+# usage: python benchmarks/suite.py [--scenarios a,b] [--frames n] [--output results.json] [--baseline benchmarks/baseline.json] [--tolerance 0.25]
+import os, sys, json, gc, platform, subprocess, tempfile, tracemalloc
+from argparse import ArgumentParser
+from time import perf_counter
+
+os.environ['PLATFORMER_HEADLESS'] = '1'
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'code'))
+
+from settings import *
+from main import Game
+from profiler import Profiler, percentile
+from bee_swarm import populate
+from mapgen import write_map
+
+WARMUP = 30
+# metrics the baseline gate checks, all lower is better
+GATED = ('p50_ms', 'p95_ms', 'p99_ms', 'alloc_peak_kb', 'peak_rss_mb')
+
+def carry_player(game):
+    # moves the player along the floor of a generated map, crossing it in 1200 frames
+    stride = max((game.level_width - 10 * TILE_SIZE) // 1200, 1)
+    def policy(frame):
+        game.player.rect.x = min(game.player.rect.x + stride, game.level_width - TILE_SIZE)
+        game.player.rect.bottom = game.level_height - 2 * TILE_SIZE
+        return 0
+    return policy
+
+def restart(game):
+    def policy(frame):
+        game.reset_game()
+        return 0
+    return policy
+
+# name -> (game options, prepare(game) returning the per-frame input policy)
+SCENARIOS = {
+    'idle': ({}, lambda game: lambda frame: 0),
+    # fires in place, turning around every second
+    'shooting': ({}, lambda game: lambda frame: INPUT_SHOOT | (INPUT_LEFT if frame % 120 == 0 else INPUT_RIGHT if frame % 120 == 60 else 0)),
+    'bees_1000': ({}, lambda game: populate(game, 1000) or (lambda frame: INPUT_SHOOT)),
+    'swarm_10000': ({'swarm': True}, lambda game: populate(game, 10000) or (lambda frame: INPUT_SHOOT)),
+    'restart': ({}, restart),
+    'large_map': ({'map_size': (5000, 40)}, carry_player),
+}
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    # kilobytes on linux, bytes on macos
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+def run_frames(game, policy, frames, profiler):
+    for frame in range(frames):
+        profiler.begin_frame()
+        game.step(policy(frame), 1 / FRAMERATE)
+        game.all_sprites.draw(game.player.rect.center)
+        profiler.mark('draw')
+        pygame.display.update()
+        profiler.mark('display')
+        profiler.end_frame((game.all_sprites, game.bullet_sprites, game.enemy_sprites))
+
+def run_scenario(name, frames, folder):
+    options, prepare = SCENARIOS[name]
+    options = dict(options)
+    map_size = options.pop('map_size', None)
+    game = Game(headless = True, seed = 0, **options)
+    if map_size:
+        game.map_path = write_map(join(folder, 'map.tmx'), *map_size)
+        game.reset_game()
+    # a game over does not end the run, the world keeps stepping
+    policy = prepare(game)
+
+    # timing pass, with the warmup frames dropped from the window. the game's own profiler records the phases step marks
+    profiler = game.profiler = Profiler(enabled = True, window = frames)
+    run_frames(game, policy, WARMUP, profiler)
+    profiler.frames.clear()
+    collections = sum(stats['collections'] for stats in gc.get_stats())
+    start = perf_counter()
+    run_frames(game, policy, frames, profiler)
+    elapsed = perf_counter() - start
+    collections = sum(stats['collections'] for stats in gc.get_stats()) - collections
+
+    totals = sorted(frame['total'] for frame in profiler.frames)
+    result = {
+        'frames': frames,
+        'mean_ms': elapsed * 1000 / frames,
+        'p50_ms': percentile(totals, 0.5),
+        'p95_ms': percentile(totals, 0.95),
+        'p99_ms': percentile(totals, 0.99),
+        'max_ms': totals[-1],
+        'phases_p95_ms': {phase: stats['p95'] for phase, stats in profiler.summary().items() if phase != 'total'},
+        'gc_collections': collections,
+    }
+
+    # allocation pass, shorter since tracing slows every allocation down
+    traced = game.profiler = Profiler()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    run_frames(game, policy, max(frames // 4, 1), traced)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result['alloc_peak_kb'] = (peak - baseline) / 1024
+    result['alloc_retained_kb'] = (current - baseline) / 1024
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def run_suite(names, frames):
+    results = {}
+    for name in names:
+        # a fresh interpreter per scenario, so RSS and caches from the previous one do not leak in
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name, '--frames', str(frames)], capture_output = True, text = True, check = True).stdout
+        results[name] = json.loads(output.strip().splitlines()[-1])
+        result = results[name]
+        print(f"{name:<12} p50 {result['p50_ms']:7.2f}ms  p95 {result['p95_ms']:7.2f}ms  p99 {result['p99_ms']:7.2f}ms  "
+              f"gc {result['gc_collections']:>4}  alloc peak {result['alloc_peak_kb']:8.0f}KB  rss {result['peak_rss_mb']:6.0f}MB")
+    return results
+
+def compare(results, baseline, tolerance, frames):
+    # returns the regressions: metrics more than tolerance worse than the baseline, or None when the runs
+    # are not comparable. the allocation pass runs for a share of the frames, so its numbers scale with them
+    expected_frames = baseline.get('meta', {}).get('frames')
+    if expected_frames != frames:
+        print(f'baseline was run with --frames {expected_frames}, not {frames}, rerun with the same frame count to compare')
+        return None
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get('scenarios', {}).get(name)
+        if not expected:
+            print(f'{name}: not in baseline')
+            continue
+        for metric in GATED:
+            old, new = expected.get(metric), result[metric]
+            if not old or old <= 0:
+                continue
+            change = new / old - 1
+            if change > tolerance:
+                regressions.append((name, metric, old, new, change))
+    for name, metric, old, new, change in regressions:
+        print(f'REGRESSION {name} {metric}: {old:.2f} -> {new:.2f} ({change:+.0%})')
+    return regressions
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--scenarios', default = ','.join(SCENARIOS))
+    parser.add_argument('--frames', type = int, default = 600)
+    parser.add_argument('--output', default = 'benchmark_results.json')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type = float, default = 0.25, help = 'allowed relative slowdown before a metric counts as a regression')
+    parser.add_argument('--child')
+    args = parser.parse_args()
+
+    if args.child:
+        with tempfile.TemporaryDirectory() as folder:
+            print(json.dumps(run_scenario(args.child, args.frames, folder)))
+        sys.exit(0)
+
+    names = args.scenarios.split(',')
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios {', '.join(unknown)}, choose from {', '.join(SCENARIOS)}")
+
+    results = run_suite(names, args.frames)
+    report = {
+        'meta': {'python': platform.python_version(), 'pygame': pygame.version.ver, 'platform': platform.platform(), 'frames': args.frames},
+        'scenarios': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent = 2)
+    print(f'results written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance, args.frames)
+        if regressions is None:
+            sys.exit(2)
+        if regressions:
+            sys.exit(1)
+        print(f'no regressions against {args.baseline} at {args.tolerance:.0%} tolerance')
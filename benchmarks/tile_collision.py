@@ -0,0 +1,93 @@
+# compares the linear collision scan against the TileGrid lookup on generated maps
+# usage: python benchmarks/tile_collision.py [width height]
+import os, sys
+from random import Random
+from time import perf_counter
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+from settings import * 
+from collision import TileGrid
+from sprites import Player
+
+def generate_map(width, height, rng, density = 0.3):
+    rects = []
+    grid = TileGrid(width, height)
+    for y in range(height):
+        for x in range(width):
+            if rng.random() < density:
+                rect = pygame.FRect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                rects.append(rect)
+                grid.add(x, y, rect)
+    return rects, grid
+
+def linear_collision(player, rects, direction):
+    # the pre-grid Player.collision
+    for rect in rects:
+        if rect.colliderect(player.rect):
+            if direction == 'horizontal':
+                if player.direction.x > 0: player.rect.right = rect.left
+                if player.direction.x < 0: player.rect.left = rect.right
+            if direction == 'vertical':
+                if player.direction.y > 0: player.rect.bottom = rect.top
+                if player.direction.y < 0: player.rect.top = rect.bottom
+                player.direction.y = 0
+
+def linear_floor(player, rects):
+    bottom_rect = pygame.FRect((0,0), (player.rect.width, 2)).move_to(midtop = player.rect.midbottom)
+    return bottom_rect.collidelist(rects) >= 0
+
+def make_player(grid):
+    surf = pygame.Surface((96, 128))
+    character_data = {'idle': surf, 'walk_a': surf, 'walk_b': surf, 'jump': surf}
+    return Player((0, 0), [], grid, character_data, lambda *args: None, scale = 0.5)
+
+def sample_states(width, height, rng, count):
+    states = []
+    for _ in range(count):
+        pos = (rng.uniform(-TILE_SIZE, width * TILE_SIZE), rng.uniform(-TILE_SIZE, height * TILE_SIZE))
+        direction = (rng.choice((-1, 0, 1)), rng.uniform(-20, 20))
+        states.append((pos, direction))
+    return states
+
+def run(width, height, samples = 2000, seed = 1):
+    rng = Random(seed)
+    rects, grid = generate_map(width, height, rng)
+    player = make_player(grid)
+    states = sample_states(width, height, rng, samples)
+
+    def check(step):
+        results = []
+        start = perf_counter()
+        for pos, direction in states:
+            player.rect.topleft = pos
+            player.direction.update(direction)
+            results.append(step())
+        return perf_counter() - start, results
+
+    def linear_step():
+        linear_collision(player, rects, 'horizontal')
+        linear_collision(player, rects, 'vertical')
+        return tuple(player.rect), player.direction.y, linear_floor(player, rects)
+
+    def grid_step():
+        player.collision('horizontal')
+        player.collision('vertical')
+        player.check_floor()
+        return tuple(player.rect), player.direction.y, player.on_floor
+
+    linear_time, linear_results = check(linear_step)
+    grid_time, grid_results = check(grid_step)
+    assert linear_results == grid_results, 'grid collision diverged from the linear scan'
+
+    per_query = 1_000_000 / samples
+    print(f'{width}x{height} ({len(rects)} tiles): linear {linear_time * per_query:.1f}us  grid {grid_time * per_query:.1f}us  x{linear_time / grid_time:.0f}')
+
+if __name__ == '__main__':
+    pygame.display.set_mode((1, 1))
+    if len(sys.argv) == 3:
+        run(int(sys.argv[1]), int(sys.argv[2]))
+    else:
+        for size in ((45, 25), (200, 100), (1000, 200)):
+            run(*size)
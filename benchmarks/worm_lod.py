@@ -0,0 +1,49 @@
+# checks that worms come back onto their platforms after reduced-rate ticks: every worm is updated from far away
+# for a range of step counts, so the catch-up ticks leave it at every point of its patrol, then from up close.
+# a worm at an edge steps back inside on its next update, one outside its patrol rect two steps running is stuck.
+# exits 1 when any are
+# usage: python benchmarks/worm_lod.py [far steps] [seed]
+import os, sys
+
+os.environ['PLATFORMER_HEADLESS'] = '1'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+from settings import *
+from main import Game
+from sprites import Worm
+
+NEAR = 120
+
+def stuck_worms(game, far_steps, seed):
+    game.setup(seed = seed)
+    dt = 1 / PHYSICS_RATE
+    worms = [sprite for sprite in game.all_sprites if isinstance(sprite, Worm)]
+    stuck = []
+    for worm in worms:
+        # far enough that every worm is outside the active area
+        far = (worm.main_rect.centerx + game.level_width, worm.main_rect.centery)
+        for _ in range(far_steps):
+            game.all_sprites.update(dt, far)
+        outside = False
+        for _ in range(NEAR):
+            game.all_sprites.update(dt, worm.main_rect.center)
+            if outside and not worm.main_rect.contains(worm.rect):
+                stuck.append((worm.main_rect, worm.rect.copy()))
+                break
+            outside = not worm.main_rect.contains(worm.rect)
+    return stuck
+
+if __name__ == '__main__':
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 280
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    game = Game(headless = True, seed = seed)
+    total = cases = 0
+    for far_steps in range(steps):
+        stuck = stuck_worms(game, far_steps, seed)
+        cases += len(game.stream.active)
+        total += len(stuck)
+        for main_rect, rect in stuck:
+            print(f'{far_steps:>4} far steps: worm at {rect.left:.1f}..{rect.right:.1f} outside {main_rect.left:.0f}..{main_rect.right:.0f}')
+    print(f'{total} of {cases} far -> near timings left a worm stuck')
+    if total:
+        sys.exit(1)
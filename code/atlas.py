@@ -0,0 +1,97 @@
+# packs the small sprite images into atlas pages: python code/atlas.py
+# each character's walk and jump frames get their own page so unselected characters are never decoded
+from settings import * 
+from os import makedirs, sep
+from os.path import relpath, exists, dirname
+from hashlib import sha1
+import json
+
+ATLAS_FOLDER = join('data', 'atlas')
+ATLAS_INDEX = join(ATLAS_FOLDER, 'index.json')
+ATLAS_EXCLUDE = ('images/logo.png',)
+
+def frame_key(path):
+    return path.replace(sep, '/')
+
+def fingerprint(path):
+    # by content, since fixed-size sprite art is often edited in place and checkouts reset modification times
+    with open(path, 'rb') as file:
+        return sha1(file.read()).hexdigest()
+
+def page_name(path):
+    parts = relpath(path, 'images').split(sep)
+    if parts[0] == 'player' and parts[-1] != 'idle.png':
+        return f'player_{parts[1]}'
+    return 'common'
+
+def pack(surfaces, width = 512, padding = 1):
+    # shelf packing, tallest first; returns the page surface and name -> (x, y, w, h)
+    width = max([width] + [surf.get_width() + padding for surf in surfaces.values()])
+    rects = {}
+    x = y = shelf_height = 0
+    for name, surf in sorted(surfaces.items(), key = lambda item: (-item[1].get_height(), item[0])):
+        w, h = surf.get_size()
+        if x + w > width:
+            x, y, shelf_height = 0, y + shelf_height + padding, 0
+        rects[name] = (x, y, w, h)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+
+    page = pygame.Surface((width, y + shelf_height), pygame.SRCALPHA)
+    for name, rect in rects.items():
+        page.blit(surfaces[name], rect[:2])
+    return page, rects
+
+def build(folder = 'images', output = ATLAS_FOLDER):
+    pages = {}
+    for folder_path, _, file_names in walk(folder):
+        for file_name in file_names:
+            path = join(folder_path, file_name)
+            if file_name.endswith('.png') and frame_key(path) not in ATLAS_EXCLUDE:
+                pages.setdefault(page_name(path), {})[frame_key(path)] = pygame.image.load(path)
+
+    index = {'pages': {}, 'sources': {}}
+    for name, surfaces in pages.items():
+        page, rects = pack(surfaces)
+        file_name = f'{name}.png'
+        pygame.image.save(page, join(output, file_name))
+        index['pages'][name] = {'file': file_name, 'frames': rects}
+        index['sources'].update({path: fingerprint(path) for path in surfaces})
+
+    with open(join(output, 'index.json'), 'w') as file:
+        json.dump(index, file, indent = 1, sort_keys = True)
+    return index
+
+class Atlas:
+    # hands out atlas frames as subsurfaces, decoding each page on first use
+    def __init__(self, index_path = ATLAS_INDEX):
+        self.folder = dirname(index_path)
+        with open(index_path) as file:
+            index = json.load(file)
+        self.files = {name: page['file'] for name, page in index['pages'].items()}
+        self.frames = {path: (name, rect) for name, page in index['pages'].items() for path, rect in page['frames'].items()}
+        self.sources = index['sources']
+        self.pages = {}
+        self.cache = {}
+
+    def get(self, path):
+        # None if the image is not packed or changed since packing, so callers fall back to the file
+        path = frame_key(path)
+        if path in self.cache:
+            return self.cache[path]
+        frame = None
+        if path in self.frames and exists(path) and fingerprint(path) == self.sources.get(path):
+            name, rect = self.frames[path]
+            if name not in self.pages:
+                self.pages[name] = pygame.image.load(join(self.folder, self.files[name])).convert_alpha()
+            frame = self.pages[name].subsurface(rect)
+        self.cache[path] = frame
+        return frame
+
+def load_atlas(index_path = ATLAS_INDEX):
+    return Atlas(index_path) if exists(index_path) else None
+
+if __name__ == '__main__':
+    makedirs(ATLAS_FOLDER, exist_ok = True)
+    index = build()
+    print(f"{len(index['sources'])} images packed into {len(index['pages'])} pages in {ATLAS_FOLDER}")
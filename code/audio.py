@@ -0,0 +1,54 @@
+from settings import *
+from itertools import count
+
+class MusicStream:
+    # background music decoded from disk as it plays through pygame.mixer.music instead of held in memory as a Sound
+    def __init__(self, path):
+        self.path = path
+
+    def play(self, loops = 0):
+        pygame.mixer.music.load(self.path)
+        pygame.mixer.music.play(loops)
+
+    def stop(self):
+        pygame.mixer.music.stop()
+
+class VoiceManager:
+    # plays sound effects on a fixed set of mixer channels. each sound has a cap on simultaneous voices,
+    # a sound already started this frame is not started again, and with every channel busy the
+    # lowest priority, oldest voice is stolen if it does not outrank the new one
+    def __init__(self, sounds, voices = SOUND_VOICES, channels = MIXER_CHANNELS):
+        self.sounds = sounds
+        self.voices = voices # name -> (voice cap, priority)
+        self.channels = []
+        if pygame.mixer.get_init():
+            pygame.mixer.set_num_channels(channels)
+            self.channels = [pygame.mixer.Channel(index) for index in range(channels)]
+        self.playing = [None] * len(self.channels) # channel index -> (name, priority, start order)
+        self.order = count()
+        self.started = set()
+
+    def begin_frame(self):
+        self.started.clear()
+
+    def play(self, name):
+        if name in self.started or not self.channels:
+            return None
+        cap, priority = self.voices.get(name, DEFAULT_VOICE)
+
+        busy = [index for index, channel in enumerate(self.channels) if self.playing[index] and channel.get_busy()]
+        same = [index for index in busy if self.playing[index][0] == name]
+        if len(same) >= cap:
+            # at the cap the oldest voice of the same sound restarts
+            index = min(same, key = lambda index: self.playing[index][2])
+        elif len(busy) < len(self.channels):
+            index = next(index for index, channel in enumerate(self.channels) if index not in busy)
+        else:
+            index = min(busy, key = lambda index: self.playing[index][1:])
+            if self.playing[index][1] > priority:
+                return None
+
+        self.started.add(name)
+        self.playing[index] = (name, priority, next(self.order))
+        self.channels[index].play(self.sounds[name])
+        return self.channels[index]
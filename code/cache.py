@@ -0,0 +1,36 @@
+from settings import * 
+from collections import OrderedDict
+
+class SurfaceCache:
+    # derived variants of source surfaces, keyed by (source, flip_x, flip_y, scale, effect), least recently used evicted first
+    def __init__(self, max_size = 512):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def get(self, surf, flip_x = False, flip_y = False, scale = 1.0, effect = None):
+        if not (flip_x or flip_y or effect) and scale == 1.0:
+            return surf
+
+        key = (surf, flip_x, flip_y, scale, effect)
+        derived = self.entries.get(key)
+        if derived is None:
+            derived = self.entries[key] = self.derive(surf, flip_x, flip_y, scale, effect)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+        else:
+            self.entries.move_to_end(key)
+        return derived
+
+    def derive(self, surf, flip_x, flip_y, scale, effect):
+        if scale != 1.0:
+            surf = pygame.transform.scale(surf, (int(surf.get_width() * scale), int(surf.get_height() * scale)))
+        if flip_x or flip_y:
+            surf = pygame.transform.flip(surf, flip_x, flip_y)
+        if effect == 'mask':
+            return pygame.mask.from_surface(surf)
+        if effect == 'silhouette':
+            surf = pygame.mask.from_surface(surf).to_surface()
+            surf.set_colorkey('black')
+        return surf
+
+surface_cache = SurfaceCache()
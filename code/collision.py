@@ -0,0 +1,98 @@
+from settings import * 
+
+class TileGrid:
+    def __init__(self, width, height, tile_size = TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.cells = [None] * (width * height)
+
+    def add(self, x, y, rect):
+        self.cells[y * self.width + x] = rect
+
+    def cell_range(self, rect):
+        x_start = max(int(rect.left // self.tile_size), 0)
+        x_end = min(int(rect.right // self.tile_size), self.width - 1)
+        y_start = max(int(rect.top // self.tile_size), 0)
+        y_end = min(int(rect.bottom // self.tile_size), self.height - 1)
+        for y in range(y_start, y_end + 1):
+            row = y * self.width
+            for x in range(x_start, x_end + 1):
+                yield row + x
+
+    def overlapping(self, rect):
+        # yields the tiles rect collides with in map load order, the same order a scan over every tile sees them.
+        # the caller may move rect between yields; the lookup follows it and never revisits an earlier tile
+        last_index = -1
+        while True:
+            bounds = tuple(rect)
+            for index in self.cell_range(rect):
+                tile_rect = self.cells[index]
+                if index > last_index and tile_rect is not None and tile_rect.colliderect(rect):
+                    last_index = index
+                    yield tile_rect
+                    if tuple(rect) != bounds:
+                        break
+            else:
+                return
+
+    def collides(self, rect):
+        # the cell walk of cell_range, inlined to skip the generator and list per call
+        size, width, cells = self.tile_size, self.width, self.cells
+        x_start, x_end = max(int(rect.left // size), 0), min(int(rect.right // size), width - 1)
+        for y in range(max(int(rect.top // size), 0), min(int(rect.bottom // size), self.height - 1) + 1):
+            row = y * width
+            for index in range(row + x_start, row + x_end + 1):
+                tile_rect = cells[index]
+                if tile_rect is not None and tile_rect.colliderect(rect):
+                    return True
+        return False
+
+class SpatialHash:
+    # uniform grid broadphase for moving sprites, rebuilt once per frame.
+    # hashing a sprite costs about as much as checking it against scan_limit rects, so a frame making
+    # no more queries than that scans the sprites instead and leaves the grid empty
+    def __init__(self, cell_size = 128, scan_limit = 16):
+        self.cell_size = cell_size
+        self.scan_limit = scan_limit
+        self.cells = {}
+        self.spare = [] # emptied cell lists, reused by the next rebuild
+        self.scanned = None # the sprites of a frame answered by scanning
+
+    def cell_keys(self, rect):
+        size = self.cell_size
+        for y in range(int(rect.top // size), int(rect.bottom // size) + 1):
+            for x in range(int(rect.left // size), int(rect.right // size) + 1):
+                yield x, y
+
+    def rebuild(self, sprites, queries = None):
+        # queries is how many lookups the frame will make, None when not known
+        cells, spare = self.cells, self.spare
+        for cell in cells.values():
+            cell.clear()
+            spare.append(cell)
+        cells.clear()
+        if queries is not None and queries <= self.scan_limit:
+            self.scanned = sprites
+            return
+        self.scanned = None
+        for sprite in sprites:
+            for key in self.cell_keys(sprite.rect):
+                cell = cells.get(key)
+                if cell is None:
+                    cell = cells[key] = spare.pop() if spare else []
+                cell.append(sprite)
+
+    def query(self, rect):
+        # sprites whose rect overlaps rect, each once
+        if self.scanned is not None:
+            return [sprite for sprite in self.scanned if sprite.rect.colliderect(rect)]
+        found = {}
+        for key in self.cell_keys(rect):
+            for sprite in self.cells.get(key, ()):
+                if sprite not in found and sprite.rect.colliderect(rect):
+                    found[sprite] = None
+        return list(found)
+
+    def collide_mask(self, sprite):
+        return [other for other in self.query(sprite.rect) if pygame.sprite.collide_mask(sprite, other)]
@@ -1,14 +1,174 @@
 from settings import * 
+from math import floor
+from itertools import count
+
+def bake_chunks(tiles, chunk_size = CHUNK_SIZE, only = None):
+    # pre-render static tiles, given as (pos, surf) in draw order, into chunk surfaces keyed by chunk coordinate.
+    # only limits the bake to a single chunk coordinate
+    chunks = {}
+    size = chunk_size * TILE_SIZE
+    for pos, surf in tiles:
+        rect = surf.get_rect(topleft = pos)
+        for chunk_y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for chunk_x in range(rect.left // size, (rect.right - 1) // size + 1):
+                if only is not None and (chunk_x, chunk_y) != only:
+                    continue
+                chunk = chunks.get((chunk_x, chunk_y))
+                if chunk is None:
+                    chunk = chunks[(chunk_x, chunk_y)] = pygame.Surface((size, size), pygame.SRCALPHA)
+                chunk.blit(surf, (rect.x - chunk_x * size, rect.y - chunk_y * size))
+    return chunks
 
 class AllSprites(pygame.sprite.Group):
     def __init__(self):
         super().__init__()
         self.display_surface = pygame.display.get_surface()
         self.offset = pygame.Vector2()
+        self.chunks = {}
+        self.batches = [] # renderers drawn after the sprites, like the bee swarm
+        self.chunk_pixels = CHUNK_SIZE * TILE_SIZE
+        self.blit_pos = pygame.Vector2() # scratch screen position for sprite blits
+        self.view = pygame.FRect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+        self.placed = {} # sprite -> scratch rect its interpolated position is written to, in group order
+
+        # positions before the last update, so drawing can interpolate between physics steps
+        self.previous = {}
+        self.alpha = 1.0
+
+        # sprites with an update of their own, mapped to the step they fall on when ticked at reduced rate.
+        # lod sprites outside the active area only update every LOD_INTERVAL steps, skipped counts the steps they
+        # missed; physics steps are fixed, so the missed time is that count times dt
+        self.updating = {}
+        self.phases = count()
+        self.steps = 0
+        self.skipped = {}
+        self.active_area = pygame.FRect(0, 0, WINDOW_WIDTH + LOD_MARGIN * 2, WINDOW_HEIGHT + LOD_MARGIN * 2)
+
+        # dirty rect mode: while the camera holds still only the areas sprites left or entered are redrawn
+        self.dirty_mode = False
+        self.last_offset = None
+        self.last_rects = {}
+
+    def add_internal(self, sprite, layer = None):
+        super().add_internal(sprite, layer)
+        self.placed[sprite] = pygame.FRect()
+        # sprites without an update of their own are never called
+        if type(sprite).update is not pygame.sprite.Sprite.update:
+            self.updating[sprite] = next(self.phases) % LOD_INTERVAL
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.placed.pop(sprite, None)
+        self.updating.pop(sprite, None)
+        self.skipped.pop(sprite, None)
+
+    def empty(self):
+        super().empty()
+        # each level starts the reduced-rate schedule over, so a replay ticks the same sprites on the same steps
+        self.phases = count()
+        self.steps = 0
+
+    def update(self, dt, focus = None):
+        # focus is the point the camera follows, without one every sprite updates every step
+        previous = self.previous
+        previous.clear()
+        for sprite in self.updating:
+            previous[sprite] = sprite.rect.topleft
+
+        if focus is not None:
+            self.active_area.center = focus
+        self.steps += 1
+        updating, skipped, active_area = self.updating, self.skipped, self.active_area
+        for sprite in list(updating):
+            near = focus is None or not sprite.lod or active_area.colliderect(sprite.rect)
+            if not near and (self.steps + updating.get(sprite, 0)) % LOD_INTERVAL:
+                skipped[sprite] = skipped.get(sprite, 0) + 1
+                continue
+            # counts are reset rather than removed, so the dict is not resized by the churn
+            missed = skipped.get(sprite)
+            if missed:
+                skipped[sprite] = 0
+                sprite.update(dt * (missed + 1))
+            else:
+                sprite.update(dt)
+
+    def interpolated(self, sprite):
+        # the sprite's rect between its previous and current position, written into its scratch rect
+        rect, placed = sprite.rect, self.placed[sprite]
+        placed.w, placed.h = rect.w, rect.h
+        previous = self.previous.get(sprite)
+        if previous is None or self.alpha >= 1:
+            placed.x, placed.y = rect.x, rect.y
+        else:
+            blend = 1 - self.alpha
+            placed.x = rect.x + (previous[0] - rect.x) * blend
+            placed.y = rect.y + (previous[1] - rect.y) * blend
+        return placed
 
-    def draw(self, target_pos):
+    def invalidate(self):
+        self.last_offset = None
+
+    def screen_rect(self, rect):
+        # padded by a pixel, blits truncate fractional positions
+        return pygame.Rect(floor(rect.left + self.offset.x) - 1, floor(rect.top + self.offset.y) - 1, rect.width + 3, rect.height + 3)
+
+    def draw(self, target_pos, alpha = 1.0):
+        # alpha places sprites between their previous and current positions,
+        # returns the screen rects that changed, or None when the whole screen was redrawn
         self.offset.x = -(target_pos[0] - WINDOW_WIDTH / 2)
         self.offset.y = -(target_pos[1] - WINDOW_HEIGHT / 2)
+        self.alpha = alpha
+        view = self.view
+        view.x, view.y = -self.offset.x, -self.offset.y
+        for sprite in self.placed:
+            self.interpolated(sprite)
+
+        if not self.dirty_mode:
+            self.draw_area(view)
+            return None
+
+        rects = {sprite: self.screen_rect(rect) for sprite, rect in self.placed.items() if rect.colliderect(view)}
+        for batch in self.batches:
+            rects.update(batch.screen_rects(self.offset, view, alpha))
+
+        dirty = None
+        if self.offset == self.last_offset:
+            dirty = [rect.union(self.last_rects[key]) if key in self.last_rects else rect for key, rect in rects.items()]
+            dirty += [rect for key, rect in self.last_rects.items() if key not in rects]
+            if len(dirty) > DIRTY_RECT_LIMIT:
+                dirty = None
+
+        if dirty is None:
+            self.draw_area(view)
+        else:
+            for rect in dirty:
+                self.display_surface.set_clip(rect)
+                self.draw_area(pygame.FRect(rect).move(-self.offset.x, -self.offset.y))
+            self.display_surface.set_clip(None)
+
+        self.last_offset = self.offset.copy()
+        self.last_rects = rects
+        return dirty
+
+    def draw_area(self, area):
+        # everything in the world rect area, drawn back to front, sprites at the positions draw placed them
+        self.display_surface.fill(BG_COLOR)
+
+        # static tiles, floored so each tile lands on the same pixel a per-tile blit would use
+        size = self.chunk_pixels
+        for chunk_y in range(int(area.top // size), int(area.bottom // size) + 1):
+            for chunk_x in range(int(area.left // size), int(area.right // size) + 1):
+                chunk = self.chunks.get((chunk_x, chunk_y))
+                if chunk:
+                    self.display_surface.blit(chunk, (floor(chunk_x * size + self.offset.x), floor(chunk_y * size + self.offset.y)))
+
+        # dynamic sprites
+        pos, offset = self.blit_pos, self.offset
+        for sprite, rect in self.placed.items():
+            if rect.colliderect(area):
+                pos.x = rect.x + offset.x
+                pos.y = rect.y + offset.y
+                self.display_surface.blit(sprite.image, pos)
 
-        for sprite in self:
-            self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
\ No newline at end of file
+        for batch in self.batches:
+            batch.draw(self.display_surface, self.offset, area, self.alpha)
@@ -0,0 +1,38 @@
+# runs the game world without a display or frame limiter
+# usage: python code/headless.py [frames] [seed]
+import sys
+from os import environ
+from random import Random
+from time import perf_counter
+
+environ['PLATFORMER_HEADLESS'] = '1'
+
+from settings import * 
+from main import Game
+
+def random_policy(seed):
+    rng = Random(seed)
+    def policy(frame):
+        return rng.getrandbits(4)
+    return policy
+
+def simulate(frames, seed, policy = None, dt = 1 / FRAMERATE):
+    game = Game(headless = True, seed = seed)
+    policy = policy or random_policy(seed)
+    for frame in range(frames):
+        if game.step(policy(frame), dt) != 'game':
+            break
+    game.finish_recording()
+    return game, frame + 1
+
+if __name__ == '__main__':
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 3600
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    start = perf_counter()
+    game, played = simulate(frames, seed)
+    elapsed = perf_counter() - start
+
+    simulated = played / FRAMERATE
+    print(f'{played} frames ({simulated:.1f}s of play) in {elapsed:.2f}s, x{simulated / elapsed:.0f} real time')
+    print(f'state {game.state}, digest {game.digest()}')
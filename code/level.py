@@ -0,0 +1,190 @@
+from settings import * 
+from array import array
+from collections import OrderedDict, defaultdict
+from math import ceil
+from os import stat
+from os.path import dirname, normpath
+from xml.etree import ElementTree
+from collision import TileGrid
+from groups import bake_chunks
+
+class Level:
+    # a map compiled to tile index arrays, spawn tables and converted tile surfaces
+    def __init__(self, width, height, layers, surfaces, entities):
+        self.width = width
+        self.height = height
+        self.layers = layers # layer name -> row-major array of indices into surfaces, 0 is empty
+        self.surfaces = surfaces
+        self.entities = entities # (name, x, y, width, height) in map order
+        self._collision_grid = None
+        self._chunks = None
+
+    def tiles(self, layer_name):
+        width, surfaces = self.width, self.surfaces
+        for index, tile in enumerate(self.layers[layer_name]):
+            if tile:
+                yield index % width, index // width, surfaces[tile]
+
+    def tiles_in(self, layer_name, left, top, right, bottom):
+        # the tiles of a layer whose cell lies in the given cell range, in the same order tiles() yields them
+        layer, width, surfaces = self.layers[layer_name], self.width, self.surfaces
+        left, right = max(left, 0), min(right, width)
+        for y in range(max(top, 0), min(bottom, self.height)):
+            row = y * width
+            for x in range(left, right):
+                tile = layer[row + x]
+                if tile:
+                    yield x, y, surfaces[tile]
+
+    @property
+    def collision_grid(self):
+        if self._collision_grid is None:
+            self._collision_grid = TileGrid(self.width, self.height)
+            for x, y, surf in self.tiles('Main'):
+                self._collision_grid.add(x, y, surf.get_frect(topleft = (x * TILE_SIZE, y * TILE_SIZE)))
+        return self._collision_grid
+
+    @property
+    def chunks(self):
+        if self._chunks is None:
+            self._chunks = ChunkCache(self)
+        return self._chunks
+
+class ChunkCache:
+    # chunk surfaces of a level's static tiles, baked on first use, least recently used evicted first
+    def __init__(self, level, max_size = CHUNK_CACHE_SIZE, chunk_size = CHUNK_SIZE, layer_names = ('Main', 'Decoration')):
+        self.level = level
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.layer_names = layer_names
+        self.entries = OrderedDict()
+        self.empty = set()
+
+        # tiles bigger than a cell reach into the chunks right of and below their own
+        self.overhang = max((ceil(max(surf.get_size()) / TILE_SIZE) - 1 for surf in level.surfaces[1:]), default = 0)
+
+    def get(self, key):
+        chunk = self.entries.get(key)
+        if chunk is not None:
+            self.entries.move_to_end(key)
+            return chunk
+        if key in self.empty:
+            return None
+
+        chunk = self.bake(key)
+        if chunk is None:
+            self.empty.add(key)
+        else:
+            self.entries[key] = chunk
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+        return chunk
+
+    def bake(self, key):
+        size = self.chunk_size
+        left, top = key[0] * size - self.overhang, key[1] * size - self.overhang
+        right, bottom = (key[0] + 1) * size, (key[1] + 1) * size
+        tiles = [((x * TILE_SIZE, y * TILE_SIZE), surf) for layer in self.layer_names for x, y, surf in self.level.tiles_in(layer, left, top, right, bottom)]
+        return bake_chunks(tiles, size, only = key).get(key)
+
+class EntityStream:
+    # entities only exist while their area is within radius chunks of the focus, typically the player.
+    # leaving entities sleep as a small state tuple and wake from it, killed ones stay dead
+    def __init__(self, entities, spawn, radius = STREAM_RADIUS, chunk_size = CHUNK_SIZE):
+        self.spawn = spawn # (index, state) -> sprite with a death_timer and a sleep() method returning its state, state is None on first spawn
+        self.radius = radius
+        self.size = chunk_size * TILE_SIZE
+        self.buckets = defaultdict(list) # chunk -> indices of the entities whose area touches it
+        for index, rect in entities:
+            for chunk_y in range(int(rect.top // self.size), int(rect.bottom // self.size) + 1):
+                for chunk_x in range(int(rect.left // self.size), int(rect.right // self.size) + 1):
+                    self.buckets[(chunk_x, chunk_y)].append(index)
+
+        self.active = {}
+        self.sleeping = {}
+        self.dead = set()
+        self.focus = None
+        self.area = pygame.FRect()
+
+    def update(self, pos):
+        # entities only change when the focus crosses into another chunk
+        focus = int(pos[0] // self.size), int(pos[1] // self.size)
+        if focus == self.focus:
+            return
+        self.focus = focus
+        radius, size = self.radius, self.size
+        self.area = pygame.FRect((focus[0] - radius) * size, (focus[1] - radius) * size, (radius * 2 + 1) * size, (radius * 2 + 1) * size)
+
+        wanted = set()
+        for chunk_y in range(focus[1] - radius, focus[1] + radius + 1):
+            for chunk_x in range(focus[0] - radius, focus[0] + radius + 1):
+                wanted.update(self.buckets.get((chunk_x, chunk_y), ()))
+
+        for index, sprite in list(self.active.items()):
+            # a hit sprite still playing its death counts as dead, it must not wake up alive
+            if not sprite.alive() or sprite.death_timer:
+                del self.active[index]
+                self.dead.add(index)
+            elif index not in wanted:
+                del self.active[index]
+                self.sleeping[index] = sprite.sleep()
+                sprite.kill()
+
+        # woken in map order, so spawning draws from the shared RNG in a fixed sequence
+        for index in sorted(wanted - self.active.keys() - self.dead):
+            self.active[index] = self.spawn(index, self.sleeping.pop(index, None))
+
+def compile_level(tmx_map, layer_names = ('Main', 'Decoration'), entity_layer = 'Entities'):
+    surfaces = [None]
+    gid_index = {}
+    layers = {}
+    for name in layer_names:
+        tiles = array('H', bytes(2 * tmx_map.width * tmx_map.height))
+        layer = tmx_map.get_layer_by_name(name)
+        for y, row in enumerate(layer.data):
+            for x, gid in enumerate(row):
+                if gid and tmx_map.images[gid]:
+                    if gid not in gid_index:
+                        gid_index[gid] = len(surfaces)
+                        surfaces.append(tmx_map.images[gid])
+                    tiles[y * tmx_map.width + x] = gid_index[gid]
+        layers[name] = tiles
+
+    entities = [(obj.name, obj.x, obj.y, obj.width, obj.height) for obj in tmx_map.get_layer_by_name(entity_layer)]
+    return Level(tmx_map.width, tmx_map.height, layers, surfaces, entities)
+
+def map_sources(path):
+    # the map, its external tileset files and their images. read from the files themselves, pytmx only keeps
+    # the resolved image paths and drops the .tsx references
+    sources = [path]
+    for tileset in ElementTree.parse(path).getroot().iter('tileset'):
+        folder, element = dirname(path), tileset
+        if tileset.get('source'):
+            tsx = normpath(join(folder, tileset.get('source')))
+            sources.append(tsx)
+            folder, element = dirname(tsx), ElementTree.parse(tsx).getroot()
+        sources += [normpath(join(folder, image.get('source'))) for image in element.iter('image')]
+    return sources
+
+class LevelCache:
+    # compiled levels by path, recompiled when the map, its tilesets or their images change on disk
+    def __init__(self):
+        self.levels = {}
+
+    def stamp(self, paths):
+        return tuple((path, stat(path).st_mtime_ns, stat(path).st_size) for path in paths)
+
+    def load(self, path):
+        cached = self.levels.get(path)
+        if cached and self.stamp(path for path, _, _ in cached[0]) == cached[0]:
+            return cached[1]
+
+        tmx_map = load_pygame(path)
+        level = compile_level(tmx_map)
+        self.levels[path] = (self.stamp(map_sources(path)), level)
+        return level
+
+    def clear(self):
+        self.levels.clear()
+
+level_cache = LevelCache()
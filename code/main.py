@@ -1,18 +1,57 @@
 from settings import * 
 from sprites import * 
 from groups import AllSprites
+from collision import SpatialHash
+from level import level_cache, EntityStream
 from support import * 
-from timer import Timer
-from random import randint
+from timer import Timer, VirtualClock, set_clock, scheduler
+from profiler import Profiler
+from pool import Pool
+from ui import UILayer
+from audio import VoiceManager
+from swarm import BeeSwarm, np
+from replay import InputRecorder
+from hashlib import sha1
+from warnings import catch_warnings, simplefilter
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless = HEADLESS, seed = None, swarm = BEE_SWARM):
         pygame.init()
-        self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.FULLSCREEN)
+        self.use_swarm = swarm and np is not None
+        if headless:
+            self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        elif RENDER_SIZE:
+            # SCALED presents the logical surface through the GPU and maps mouse positions back to it
+            environ.setdefault('SDL_RENDER_SCALE_QUALITY', 'linear' if RENDER_SCALING == 'smooth' else 'nearest')
+            if RENDER_SCALING == 'integer':
+                # SDL only holds a SCALED window to whole-number factors, so the window is stretched
+                # borderless over the desktop instead of made fullscreen and the remainder letterboxed
+                self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SCALED)
+                with catch_warnings():
+                    # pygame-ce 2.5 has no other handle on the display module's window
+                    simplefilter('ignore', DeprecationWarning)
+                    window = pygame.Window.from_display_module()
+                window.borderless = True
+                window.position = (0, 0)
+                window.size = pygame.display.get_desktop_sizes()[0]
+            else:
+                self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.FULLSCREEN | pygame.SCALED)
+        else:
+            self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.FULLSCREEN)
+
+        self.tick = 1 / PHYSICS_RATE
+        self.accumulator = 0
         pygame.display.set_caption('Platformer')
         self.clock = pygame.time.Clock()
         self.running = True
-        self.state = 'menu'
+        self.state = 'game' if headless else 'menu'
+        self.ui_state = None
+        self.dirty_rects = None
+        self.map_path = join('data', 'maps', 'world.tmx')
+        self.recorder = None
+        if seed is not None:
+            RNG.seed(seed)
+        self.profiler = Profiler(PROFILE)
 
         self.character_names = ["Sage", "Ember", "Coral", "Iris", "Solar"]
         self.character_keys = ["beige", "green", "pink", "purple", "yellow"]
@@ -33,33 +72,51 @@ class Game:
         robus_path = join('data', 'fonts', 'Robus-BWqOd.otf')
         self.font_robus = pygame.font.Font(robus_path, 60)
 
+        # ui 
+        self.ui = UILayer()
+        self.overlay = pygame.Surface((0, 0))
+
         # groups 
         self.all_sprites = AllSprites()
-        self.collision_sprites = pygame.sprite.Group()
         self.bullet_sprites = pygame.sprite.Group()
         self.enemy_sprites = pygame.sprite.Group()
+        self.enemy_hash = SpatialHash()
+
+        # pools 
+        self.bullet_pool = Pool(Bullet, POOL_CAPS['bullet'])
+        self.fire_pool = Pool(Fire, POOL_CAPS['fire'])
+        self.bee_pool = Pool(Bee, POOL_CAPS['bee'])
 
         # load game 
         self.load_assets()
         self.setup()
-
-        # timers 
-        self.bee_timer = Timer(1000, func = self.create_bee, autostart = True, repeat = True)
     
     def create_bee(self):
-        Bee(frames = self.bee_frames, 
-            pos = ((self.level_width + WINDOW_WIDTH),(randint(0,self.level_height))), 
-            groups = (self.all_sprites, self.enemy_sprites),
-            speed = randint(300,500))
+        if self.swarm:
+            self.swarm.spawn(BEE_SPAWN_BATCH, self.bee_spawn_x(), (0, self.level_height), (300, 500))
+            return
+
+        for _ in range(BEE_SPAWN_BATCH):
+            self.bee_pool.acquire(
+                frames = self.bee_frames, 
+                pos = (self.bee_spawn_x(),(RNG.randint(0,self.level_height))), 
+                groups = (self.all_sprites, self.enemy_sprites),
+                speed = RNG.randint(300,500),
+                bounds = self.bee_bounds)
+
+    def bee_spawn_x(self):
+        # bees enter beyond the right edge of the level, or of the streamed area on maps too large to fly across
+        return min(self.level_width, self.stream.area.right) + WINDOW_WIDTH
 
     def create_bullet(self, pos, direction):
         x = pos[0] + direction * 34 if direction == 1 else pos[0] + direction * 34 - self.bullet_surf.get_width()
-        Bullet(self.bullet_surf, (x, pos[1]), direction, (self.all_sprites, self.bullet_sprites))
-        Fire(self.fire_surf, pos, self.all_sprites, self.player)
-        self.audio['shoot'].play()
+        self.bullet_pool.acquire(surf = self.bullet_surf, pos = (x, pos[1]), direction = direction, groups = (self.all_sprites, self.bullet_sprites), bounds = self.level_rect)
+        self.fire_pool.acquire(surf = self.fire_surf, pos = pos, groups = self.all_sprites, player = self.player)
+        self.voices.play('shoot')
 
     def load_assets(self):
         # graphics 
+        # character frames load on first use
         self.characters = {
             "beige": load_character("beige"),
             "green": load_character("green"),
@@ -74,95 +131,208 @@ class Game:
         self.worm_frames = import_folder('images', 'enemies', 'worm')
         self.logo = import_image('images', 'logo')
 
-        # sounds 
+        # sounds, decoded on a background thread; one asked for first is loaded on the spot
         self.audio = audio_importer('audio')
+        self.audio.preload()
+        self.voices = VoiceManager(self.audio)
+        self.music = self.audio.get('music')
 
-    def setup(self):
+    def setup(self, seed = None):
         self.all_sprites.empty()
-        self.collision_sprites.empty()
         self.bullet_sprites.empty()
         self.enemy_sprites.empty()
-        self.audio['music'].stop()
-        
-        tmx_map = load_pygame(join('data', 'maps', 'world.tmx'))
-        self.level_width = tmx_map.width * TILE_SIZE
-        self.level_height = tmx_map.height * TILE_SIZE
-
-        for x, y, image in tmx_map.get_layer_by_name('Main').tiles():
-            Sprite((x * TILE_SIZE,y * TILE_SIZE), image, (self.all_sprites, self.collision_sprites))
+        self.stop_music()
+        self.accumulator = 0
+        self.kills = 0
+
+        # every level starts from its own seed at game time 0, so its inputs are all a replay needs
+        self.finish_recording()
+        self.seed = RNG.getrandbits(32) if seed is None else seed
+        RNG.seed(self.seed)
+        if RECORD_INPUT:
+            self.recorder = InputRecorder(self.seed, self.selected_character, self.map_path)
+
+        # timers and bee motion run on game time, which only advances with physics steps
+        self.virtual_clock = VirtualClock()
+        set_clock(self.virtual_clock)
+        self.bee_timer = Timer(1000, func = self.create_bee, autostart = True, repeat = True)
         
-        for x, y, image in tmx_map.get_layer_by_name('Decoration').tiles():
-            Sprite((x * TILE_SIZE,y * TILE_SIZE), image, self.all_sprites)
+        # the compiled level is cached, so restarts skip the TMX parser and reuse the baked tiles
+        level = level_cache.load(self.map_path)
+        self.level_width = level.width * TILE_SIZE
+        self.level_height = level.height * TILE_SIZE
+        self.level_rect = pygame.FRect(0, 0, self.level_width, self.level_height)
+        self.bee_bounds = self.level_rect.inflate(0, WINDOW_HEIGHT * 2)
+        self.collision_grid = level.collision_grid
+        self.all_sprites.chunks = level.chunks
+
+        self.swarm = BeeSwarm(self.bee_frames, self.bee_bounds, seed = RNG.getrandbits(32)) if self.use_swarm else None
+        self.all_sprites.batches = [self.swarm] if self.swarm else []
         
-        for obj in tmx_map.get_layer_by_name('Entities'):
-            if obj.name == 'Player':
+        self.entities = level.entities
+        for name, x, y, width, height in level.entities:
+            if name == 'Player':
                 character_data = self.characters[self.selected_character]
                 self.player = Player(
-                    (obj.x, obj.y),
+                    (x, y),
                     self.all_sprites,
-                    self.collision_sprites,
+                    self.collision_grid,
                     character_data,
                     self.create_bullet,
                     scale=0.50
                 )
 
-            if obj.name == 'Worm':
-                Worm(
-                    self.worm_frames,
-                    pygame.FRect(obj.x, obj.y, obj.width, obj.height),
-                    (self.all_sprites, self.enemy_sprites),
-                    self  # pass game reference
-                )
-
-
-        # self.audio['music'].play(loops = -1)
-        self.audio['music'].play(loops = -1)
+        # worms are spawned and put to sleep by the stream as the player moves through the map
+        worms = [(index, pygame.FRect(x, y, width, height)) for index, (name, x, y, width, height) in enumerate(level.entities) if name == 'Worm']
+        self.stream = EntityStream(worms, self.spawn_worm)
+        self.update_stream()
+
+        if self.music:
+            self.music.play(loops = -1)
+
+    def spawn_worm(self, index, state):
+        name, x, y, width, height = self.entities[index]
+        return Worm(
+            self.worm_frames,
+            pygame.FRect(x, y, width, height),
+            (self.all_sprites, self.enemy_sprites),
+            self,  # pass game reference
+            state
+        )
+
+    def update_stream(self):
+        self.stream.update(self.player.rect.center)
+        # bees behind the streamed area are despawned
+        self.bee_bounds.left = max(self.level_rect.left, self.stream.area.left)
+
+    def finish_recording(self):
+        if self.recorder and self.recorder.steps:
+            self.recorder.save(join(RECORD_INPUT, f'{self.seed}.rec'), self.digest())
+        self.recorder = None
+
+    def digest(self):
+        # fingerprint of the world state, equal digests mean a replay reproduced the run
+        digest = sha1(self.state.encode())
+        for sprite in self.all_sprites:
+            digest.update(f'{type(sprite).__name__}{sprite.rect.x:.3f},{sprite.rect.y:.3f};'.encode())
+        if self.swarm:
+            for x, y in zip(self.swarm.x[:self.swarm.count], self.swarm.y[:self.swarm.count]):
+                digest.update(f'Bee{x:.3f},{y:.3f};'.encode())
+        return digest.hexdigest()
+
+    def stop_music(self):
+        if self.music:
+            self.music.stop()
 
     def reset_game(self):
         self.all_sprites.empty()
-        self.collision_sprites.empty()
         self.bullet_sprites.empty()
         self.enemy_sprites.empty()
-        self.audio['music'].stop()
+        self.stop_music()
         self.setup()
         self.state = 'game'
 
     def collision(self):
+        # one lookup per bullet and one for the player
+        self.enemy_hash.rebuild(self.enemy_sprites.sprites(), len(self.bullet_sprites) + 1)
+
         # bullets -> enemies 
         for bullet in self.bullet_sprites:
-            sprite_collision = pygame.sprite.spritecollide(bullet, self.enemy_sprites, False, pygame.sprite.collide_mask)
-            if sprite_collision:
-                self.audio['impact'].play()
+            sprite_collision = self.enemy_hash.collide_mask(bullet)
+            swarm_collision = self.swarm.collide_mask(bullet) if self.swarm else None
+            if sprite_collision or swarm_collision:
+                self.voices.play('impact')
                 bullet.kill()
+                # enemies already dying from an earlier hit are not counted again
+                self.kills += sum(not sprite.death_timer for sprite in sprite_collision)
+                if swarm_collision:
+                    self.kills += int((self.swarm.death_time[swarm_collision] < 0).sum())
                 for sprite in sprite_collision:
                     sprite.destroy()
+                if swarm_collision:
+                    self.swarm.destroy(swarm_collision)
         
         # enemies -> player
-        if pygame.sprite.spritecollide(self.player, self.enemy_sprites, False, pygame.sprite.collide_mask):
+        if self.enemy_hash.collide_mask(self.player) or (self.swarm and self.swarm.collide_mask(self.player)):
             self.state = 'game_over'
 
-    def run_game(self, dt):
-        self.bee_timer.update()
-        self.all_sprites.update(dt)
+    def step(self, inputs, dt):
+        # advance the world by one frame; inputs is a mask of INPUT_* actions
+        if self.recorder:
+            self.recorder.record(inputs, dt)
+        self.virtual_clock.advance(dt * 1000)
+        self.voices.begin_frame()
+        self.player.actions = inputs
+        self.update_stream()
+        scheduler.update()
+        self.profiler.mark('timers')
+        self.all_sprites.update(dt, self.player.rect.center)
+        if self.swarm:
+            self.swarm.update(dt)
+        self.profiler.mark('update')
         self.collision()
+        self.profiler.mark('collision')
         if self.player.rect.top > self.level_height:
             self.state = 'game_over'
-        self.display_surface.fill(BG_COLOR)
-        self.all_sprites.draw(self.player.rect.center)
+        if self.state != 'game':
+            self.finish_recording()
+        return self.state
+
+    def run_game(self, dt):
+        # fixed-timestep physics, rendering interpolates between the last two physics states
+        self.accumulator += dt
+        steps = 0
+        while self.accumulator >= self.tick and steps < MAX_PHYSICS_STEPS and self.state == 'game':
+            self.step(read_keyboard(), self.tick)
+            self.accumulator -= self.tick
+            steps += 1
+        if steps == MAX_PHYSICS_STEPS:
+            # drop the backlog rather than fall further behind
+            self.accumulator = min(self.accumulator, self.tick)
+
+        alpha = self.accumulator / self.tick
+        self.all_sprites.alpha = alpha
+        camera = self.all_sprites.interpolated(self.player).center
+        self.dirty_rects = self.all_sprites.draw(camera, alpha)
 
     def draw_menu_background(self):
-        self.display_surface.fill(BG_COLOR)
         # Draw the game world but focused on player or center
         # We can use the current player position
+        self.all_sprites.invalidate()
         self.all_sprites.draw(self.player.rect.center)
         
         # Darken
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill((0,0,0))
-        self.display_surface.blit(overlay, (0,0))
+        if self.overlay.get_size() != self.display_surface.get_size():
+            self.overlay = pygame.Surface(self.display_surface.get_size())
+            self.overlay.set_alpha(128)
+        self.display_surface.blit(self.overlay, (0,0))
+
+    def menu_layout(self):
+        y_pos = WINDOW_HEIGHT / 2 + 120
+        x_start = WINDOW_WIDTH / 2 - 240
+        spacing = 130
+        slots = [self.characters[key]["idle"].get_rect(center=(x_start + index * spacing, y_pos)) for index, key in enumerate(self.character_keys)]
+        play_rect = self.ui.text(self.font_large, 'PLAY', 'White').get_rect(center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 1.3))
+        return y_pos, slots, play_rect
 
     def run_menu(self):
+        mouse_pos = pygame.mouse.get_pos()
+        y_pos, slots, play_rect = self.menu_layout()
+        play_hovered = play_rect.collidepoint(mouse_pos)
+
+        # the menu is only redrawn when the selection or the hovered button changes
+        self.dirty_rects = self.ui.draw(self.display_surface, ('menu', self.selected_character, play_hovered), lambda: self.draw_menu(y_pos, slots, play_rect, play_hovered))
+
+        # Selection click
+        if pygame.mouse.get_pressed()[0]:
+            for key, rect in zip(self.character_keys, slots):
+                if rect.collidepoint(mouse_pos):
+                    self.selected_character = key
+            if play_hovered:
+                self.setup()      # build level with selected character
+                self.state = 'game' 
+
+    def draw_menu(self, y_pos, slots, play_rect, play_hovered):
         self.draw_menu_background()
         
         # Logo
@@ -170,22 +340,12 @@ class Game:
         self.display_surface.blit(self.logo, logo_rect)
         
         # character selection 
-        mouse_pos = pygame.mouse.get_pos()
-        slot_size = 110
-        y_pos = WINDOW_HEIGHT / 2 + 120
-        x_start = WINDOW_WIDTH / 2 - 240
-        spacing = 130
-        
-        select_text = self.font_large.render("Select Character", True, "White")
+        select_text = self.ui.text(self.font_large, "Select Character", "White")
         select_rect = select_text.get_rect(center=(WINDOW_WIDTH/2, y_pos - 100))
         self.display_surface.blit(select_text, select_rect)
 
-
-        for index, key in enumerate(self.character_keys):
-
-            preview = self.characters[key]["idle"]
-            rect = preview.get_rect(center=(x_start + index * spacing, y_pos))
-            self.display_surface.blit(preview, rect)
+        for index, (key, rect) in enumerate(zip(self.character_keys, slots)):
+            self.display_surface.blit(self.characters[key]["idle"], rect)
 
             # Get name + color
             name, color = self.character_display[index]
@@ -196,56 +356,39 @@ class Game:
             else:
                 render_color = color
 
-            name_text = self.font.render(name, True, render_color)
+            name_text = self.ui.text(self.font, name, render_color)
             name_rect = name_text.get_rect(center=(rect.centerx, rect.bottom + 25))
             self.display_surface.blit(name_text, name_rect)
 
-            # Selection click
-            if rect.collidepoint(mouse_pos) and pygame.mouse.get_pressed()[0]:
-                self.selected_character = key
-
-        # Play Button
-        play_text = self.font_large.render('PLAY', True, 'White')
-        play_rect = play_text.get_rect(center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 1.3))
-        
-        # Draw button background (hover effect)
-        if play_rect.collidepoint(mouse_pos):
-            pygame.draw.rect(self.display_surface, (100, 100, 100), play_rect.inflate(40, 40), border_radius=12)
-            if pygame.mouse.get_pressed()[0]:
-                    self.setup()      # build level with selected character
-                    self.state = 'game' 
-        else:
-            pygame.draw.rect(self.display_surface, (50, 50, 50), play_rect.inflate(40, 40), border_radius=12)
-        
-        self.display_surface.blit(play_text, play_rect)
+        # Play Button, background shows the hover effect
+        button_color = (100, 100, 100) if play_hovered else (50, 50, 50)
+        pygame.draw.rect(self.display_surface, button_color, play_rect.inflate(40, 40), border_radius=12)
+        self.display_surface.blit(self.ui.text(self.font_large, 'PLAY', 'White'), play_rect)
 
+    def run_game_over(self):
+        # Restart Button
+        restart_rect = self.ui.text(self.font_large, 'Restart', 'White').get_rect(center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2))
+        restart_hovered = restart_rect.collidepoint(pygame.mouse.get_pos())
+        self.dirty_rects = self.ui.draw(self.display_surface, ('game_over', restart_hovered), lambda: self.draw_game_over(restart_rect, restart_hovered))
 
+        if restart_hovered and pygame.mouse.get_pressed()[0]:
+            self.reset_game()
 
-    def run_game_over(self):
+    def draw_game_over(self, restart_rect, restart_hovered):
         self.draw_menu_background()
         
         # Game Over Text
-        game_over_text = self.font_robus.render('Game Over', True, 'Red')
+        game_over_text = self.ui.text(self.font_robus, 'Game Over', 'Red')
         game_over_rect = game_over_text.get_rect(center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 3))
         self.display_surface.blit(game_over_text, game_over_rect)
 
-        # Restart Button
-        restart_text = self.font_large.render('Restart', True, 'White')
-        restart_rect = restart_text.get_rect(center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2))
-
         # Stop the audio
-        self.audio['music'].stop()
+        self.stop_music()
         
         # Draw button background (hover effect)
-        mouse_pos = pygame.mouse.get_pos()
-        if restart_rect.collidepoint(mouse_pos):
-            pygame.draw.rect(self.display_surface, (100, 100, 100), restart_rect.inflate(20, 10))
-            if pygame.mouse.get_pressed()[0]:
-                self.reset_game()
-        else:
-            pygame.draw.rect(self.display_surface, (50, 50, 50), restart_rect.inflate(20, 10))
-        
-        self.display_surface.blit(restart_text, restart_rect)
+        button_color = (100, 100, 100) if restart_hovered else (50, 50, 50)
+        pygame.draw.rect(self.display_surface, button_color, restart_rect.inflate(20, 10))
+        self.display_surface.blit(self.ui.text(self.font_large, 'Restart', 'White'), restart_rect)
 
     def run(self):
         while self.running:
@@ -253,16 +396,39 @@ class Game:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False 
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_F3:
+                        self.profiler.toggle()
+                    if event.key == pygame.K_F4:
+                        self.profiler.export('profile.json')
+                        self.profiler.export('profile.csv')
             
+            self.profiler.begin_frame()
+            # the profiler overlay is redrawn every frame, so it turns dirty rect updates off while shown
+            dirty_mode = DIRTY_RECTS and not self.profiler.show_overlay
+            if self.state != self.ui_state or dirty_mode != self.ui.dirty_mode:
+                self.ui.invalidate()
+                self.all_sprites.invalidate()
+                self.ui_state = self.state
+            self.ui.dirty_mode = self.all_sprites.dirty_mode = dirty_mode
+            self.dirty_rects = None
             if self.state == 'menu':
                 self.run_menu()
             elif self.state == 'game':
                 self.run_game(dt)
             elif self.state == 'game_over':
                 self.run_game_over()
+            self.profiler.draw(self.display_surface)
+            self.profiler.mark('draw')
             
-            pygame.display.update()
+            if self.dirty_rects is None:
+                pygame.display.update()
+            elif self.dirty_rects:
+                pygame.display.update(self.dirty_rects)
+            self.profiler.mark('display')
+            self.profiler.end_frame((self.all_sprites, self.bullet_sprites, self.enemy_sprites))
         
+        self.finish_recording()
         pygame.quit()
 
 if __name__ == '__main__':
@@ -0,0 +1,33 @@
+from settings import * 
+
+class Pool:
+    __slots__ = ('factory', 'cap', 'free')
+
+    # recycles killed sprites; at most cap idle instances are kept, extras are left to the garbage collector
+    def __init__(self, factory, cap = 64):
+        self.factory = factory
+        self.cap = cap
+        self.free = []
+
+    def acquire(self, **kwargs):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(**kwargs)
+        else:
+            obj = self.factory(**kwargs)
+            obj.pool = self
+        return obj
+
+    def release(self, obj):
+        if len(self.free) < self.cap:
+            self.free.append(obj)
+
+class Poolable:
+    # mixin for sprites handed out by a Pool: kill() returns the sprite to its pool once
+    pool = None
+
+    def kill(self):
+        released = self.pool is not None and self.alive()
+        super().kill()
+        if released:
+            self.pool.release(self)
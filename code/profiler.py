@@ -0,0 +1,98 @@
+from settings import * 
+from collections import deque
+from time import perf_counter
+import csv, json
+
+PHASES = ('timers', 'update', 'collision', 'draw', 'display')
+GROUPS = ('all_sprites', 'bullet_sprites', 'enemy_sprites')
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+class Profiler:
+    def __init__(self, enabled = False, window = 600, spike_factor = 2.0, max_spikes = 500):
+        self.enabled = enabled
+        self.recording = enabled # whether frames are recorded with the overlay hidden
+        self.show_overlay = False
+        self.frames = deque(maxlen = window)
+        self.spikes = deque(maxlen = max_spikes)
+        self.spike_factor = spike_factor
+        self.frame_count = 0
+        self.current = {}
+        self.last_mark = 0
+
+        self.font = pygame.font.Font(None, 22)
+        self.overlay = None
+
+    def toggle(self):
+        # shows or hides the overlay, which needs frames recorded while it is up
+        self.show_overlay = not self.show_overlay
+        self.enabled = self.show_overlay or self.recording
+        self.overlay = None
+
+    def begin_frame(self):
+        if not self.enabled: return
+        self.current = {}
+        self.last_mark = perf_counter()
+
+    def mark(self, phase):
+        # time since the previous mark is booked to phase
+        if not self.enabled: return
+        now = perf_counter()
+        self.current[phase] = self.current.get(phase, 0) + (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def end_frame(self, groups):
+        if not self.enabled: return
+        self.frame_count += 1
+        frame = {'frame': self.frame_count}
+        frame.update({phase: self.current.get(phase, 0.0) for phase in PHASES})
+        frame['total'] = sum(frame[phase] for phase in PHASES)
+        frame.update({name: len(group) for name, group in zip(GROUPS, groups)})
+
+        if len(self.frames) >= 30:
+            median = percentile(sorted(f['total'] for f in self.frames), 0.5)
+            if frame['total'] > median * self.spike_factor:
+                self.spikes.append(frame)
+        self.frames.append(frame)
+
+    def summary(self):
+        stats = {}
+        for phase in PHASES + ('total',):
+            values = sorted(frame[phase] for frame in self.frames)
+            stats[phase] = {'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95), 'p99': percentile(values, 0.99)}
+        return stats
+
+    def draw(self, surface):
+        if not self.show_overlay: return
+        # percentiles are re-rendered a few times per second, not every frame
+        if self.overlay is None or self.frame_count % 15 == 0:
+            lines = ['phase        p50    p95    p99 (ms)']
+            for phase, stats in self.summary().items():
+                lines.append(f"{phase:<10} {stats['p50']:6.2f} {stats['p95']:6.2f} {stats['p99']:6.2f}")
+            if self.frames:
+                lines.append('  '.join(f'{name} {self.frames[-1][name]}' for name in GROUPS))
+            lines.append(f'spikes {len(self.spikes)}')
+
+            height = self.font.get_linesize()
+            self.overlay = pygame.Surface((360, height * len(lines) + 10))
+            self.overlay.set_alpha(200)
+            for index, line in enumerate(lines):
+                self.overlay.blit(self.font.render(line, True, 'White'), (5, 5 + index * height))
+        surface.blit(self.overlay, (10, 10))
+
+    def export(self, path):
+        # .csv gets one row per recorded frame with a spike column, anything else gets json
+        spike_frames = {frame['frame'] for frame in self.spikes}
+        if path.endswith('.csv'):
+            fields = ['frame', *PHASES, 'total', *GROUPS, 'spike']
+            with open(path, 'w', newline = '') as file:
+                writer = csv.DictWriter(file, fieldnames = fields)
+                writer.writeheader()
+                for frame in self.frames:
+                    writer.writerow({**frame, 'spike': frame['frame'] in spike_frames})
+        else:
+            with open(path, 'w') as file:
+                json.dump({'summary': self.summary(), 'frames': list(self.frames), 'spikes': list(self.spikes)}, file, indent = 2)
@@ -0,0 +1,148 @@
+# records the per-step input of a level and replays it headless at full speed
+# usage: python code/replay.py recording.rec [...]
+from struct import pack, unpack_from
+
+MAGIC = b'PLRP'
+VERSION = 1
+NEW_DT = 0x80 # set on a run whose dt differs from the previous run, the float64 dt follows the count
+END = 0xFF # followed by the 20 byte digest of the final world state
+
+def write_varint(buffer, value):
+    while value >= 0x80:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+def write_text(buffer, text):
+    encoded = text.encode()
+    write_varint(buffer, len(encoded))
+    buffer += encoded
+
+def read_text(data, offset):
+    length, offset = read_varint(data, offset)
+    return data[offset:offset + length].decode(), offset + length
+
+class InputRecorder:
+    # input masks and dts, run-length encoded: one record per run of identical steps
+    def __init__(self, seed, character, map_path):
+        self.buffer = bytearray(MAGIC)
+        self.buffer += pack('<BI', VERSION, seed)
+        write_text(self.buffer, character)
+        write_text(self.buffer, map_path)
+        self.seed = seed
+        self.run = None # [mask, dt, count]
+        self.last_dt = None
+        self.steps = 0
+
+    def record(self, inputs, dt):
+        self.steps += 1
+        if self.run and self.run[0] == inputs and self.run[1] == dt:
+            self.run[2] += 1
+        else:
+            self.flush()
+            self.run = [inputs, dt, 1]
+
+    def flush(self):
+        if not self.run: return
+        inputs, dt, count = self.run
+        if dt != self.last_dt:
+            self.buffer.append(inputs | NEW_DT)
+            write_varint(self.buffer, count)
+            self.buffer += pack('<d', dt)
+            self.last_dt = dt
+        else:
+            self.buffer.append(inputs)
+            write_varint(self.buffer, count)
+        self.run = None
+
+    def finish(self, digest = None):
+        self.flush()
+        if digest:
+            self.buffer.append(END)
+            self.buffer += bytes.fromhex(digest)
+        return bytes(self.buffer)
+
+    def save(self, path, digest = None):
+        with open(path, 'wb') as file:
+            file.write(self.finish(digest))
+
+class Recording:
+    def __init__(self, data):
+        if data[:4] != MAGIC:
+            raise ValueError('not an input recording')
+        version, self.seed = unpack_from('<BI', data, 4)
+        if version != VERSION:
+            raise ValueError(f'unsupported recording version {version}')
+        self.character, offset = read_text(data, 9)
+        self.map_path, offset = read_text(data, offset)
+        self.data = data
+        self.start = offset
+        self.digest = None
+        if len(data) >= 21 and data[-21] == END:
+            self.digest = data[-20:].hex()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls(file.read())
+
+    def steps(self):
+        # yields (inputs, dt) for every recorded step
+        data, offset, dt = self.data, self.start, None
+        end = len(data) - 21 if self.digest else len(data)
+        while offset < end:
+            flags = data[offset]
+            count, offset = read_varint(data, offset + 1)
+            if flags & NEW_DT:
+                dt, = unpack_from('<d', data, offset)
+                offset += 8
+            inputs = flags & ~NEW_DT
+            for _ in range(count):
+                yield inputs, dt
+
+def replay(recording, game):
+    # re-simulates a recording on a headless game, returns the number of steps
+    game.selected_character = recording.character
+    game.map_path = recording.map_path
+    game.setup(seed = recording.seed)
+    game.state = 'game'
+    steps = 0
+    for inputs, dt in recording.steps():
+        game.step(inputs, dt)
+        steps += 1
+    return steps
+
+if __name__ == '__main__':
+    import sys
+    from os import environ
+    from time import perf_counter
+    environ['PLATFORMER_HEADLESS'] = '1'
+    from main import Game
+
+    game = Game(headless = True)
+    failed = False
+    for path in sys.argv[1:]:
+        recording = Recording.load(path)
+        start = perf_counter()
+        steps = replay(recording, game)
+        elapsed = perf_counter() - start
+
+        digest = game.digest()
+        if recording.digest is None:
+            outcome = 'no recorded digest'
+        elif recording.digest == digest:
+            outcome = 'outcome matches'
+        else:
+            outcome, failed = 'OUTCOME DIFFERS', True
+        print(f'{path}: {steps} steps in {elapsed:.2f}s, state {game.state}, {outcome}')
+    sys.exit(1 if failed else 0)
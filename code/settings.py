@@ -1,11 +1,72 @@
 import pygame
-from os import walk
+from os import walk, environ
 from os.path import join
+from random import Random
 from pytmx.util_pygame import load_pygame
 
+# headless runs use the SDL dummy drivers and a fixed window size
+HEADLESS = environ.get('PLATFORMER_HEADLESS') == '1'
+if HEADLESS:
+    environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+# frame-phase profiling starts enabled, F3 toggles the overlay and F4 exports
+PROFILE = environ.get('PLATFORMER_PROFILE') == '1'
+
+# draw at a fixed logical resolution that SDL scales to the screen, None draws at the native resolution.
+# 'integer' scales by the largest whole-number factor that fits, nearest neighbour and letterboxed,
+# 'smooth' fills the screen and filters linearly
+RENDER_SIZE = None
+RENDER_SCALING = 'integer'
+
 pygame.init()
-info = pygame.display.Info()
-WINDOW_WIDTH, WINDOW_HEIGHT = info.current_w,info.current_h
+if HEADLESS:
+    WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
+elif RENDER_SIZE:
+    WINDOW_WIDTH, WINDOW_HEIGHT = RENDER_SIZE
+else:
+    info = pygame.display.Info()
+    WINDOW_WIDTH, WINDOW_HEIGHT = info.current_w,info.current_h
 TILE_SIZE = 64 
+CHUNK_SIZE = 16
 FRAMERATE = 60
+# physics runs at a fixed rate independent of FRAMERATE; slow frames catch up by at most MAX_PHYSICS_STEPS
+PHYSICS_RATE = 60
+MAX_PHYSICS_STEPS = 5
 BG_COLOR = '#fcdfcd'
+
+# tile chunks are baked when first drawn and the least recently drawn dropped past CHUNK_CACHE_SIZE, twice what one view shows;
+# worms only exist within STREAM_RADIUS chunks of the player, so memory and frame cost do not grow with the map
+CHUNK_CACHE_SIZE = 2 * (WINDOW_WIDTH // (CHUNK_SIZE * TILE_SIZE) + 2) * (WINDOW_HEIGHT // (CHUNK_SIZE * TILE_SIZE) + 2)
+STREAM_RADIUS = 2
+
+# enemies more than LOD_MARGIN px outside the view update every LOD_INTERVAL steps with the dt they missed
+LOD_INTERVAL = 4
+LOD_MARGIN = 256
+
+# push only changed screen areas to the display; above the rect limit a frame is sent whole
+DIRTY_RECTS = False
+DIRTY_RECT_LIMIT = 64
+
+# bees spawned per spawn tick; swarm mode keeps them in numpy arrays instead of sprites
+BEE_SPAWN_BATCH = 1
+BEE_SWARM = False
+
+# idle instances each object pool keeps for reuse
+POOL_CAPS = {'bullet': 64, 'fire': 8, 'bee': 256}
+
+# sound effects share MIXER_CHANNELS voices, each sound gets (voice cap, priority) and higher priorities steal lower ones;
+# STREAMED_AUDIO names are played from disk through pygame.mixer.music
+MIXER_CHANNELS = 8
+SOUND_VOICES = {'shoot': (3, 1), 'impact': (4, 2)}
+DEFAULT_VOICE = (2, 0)
+STREAMED_AUDIO = ('music',)
+
+# input actions, packed into one int per frame
+INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_SHOOT = 1, 2, 4, 8
+
+# folder that every played level is recorded to for replay.py, None records nothing
+RECORD_INPUT = environ.get('PLATFORMER_RECORD')
+
+# shared random source, seeded by Game for reproducible runs
+RNG = Random()
@@ -1,48 +1,66 @@
 from settings import * 
-from timer import Timer
+from timer import Timer, get_ticks
+from cache import surface_cache
+from pool import Poolable
 from math import sin
-from random import randint
 
 class Sprite(pygame.sprite.Sprite):
+    lod = False # off-screen updates may be batched at a reduced rate
+
     def __init__(self, pos, surf, groups):
         super().__init__(groups)
         self.image = surf 
         self.rect = self.image.get_frect(topleft = pos)
 
-class Bullet(Sprite):
-    def __init__(self, surf, pos, direction, groups):
+class Bullet(Poolable, Sprite):
+    def __init__(self, surf, pos, direction, groups, bounds):
         super().__init__(pos, surf, groups)
-        
-        # adjustment 
-        self.image = pygame.transform.flip(self.image, direction == -1, False)
+        self.speed = 850
+        self.reset(surf, pos, direction, groups, bounds)
+
+    def reset(self, surf, pos, direction, groups, bounds):
+        self.image = surface_cache.get(surf, flip_x = direction == -1)
+        self.rect = self.image.get_frect(topleft = pos)
+        self.mask = surface_cache.get(self.image, effect = 'mask')
+        self.add(groups)
 
         # movement
         self.direction = direction
-        self.speed = 850
+        self.bounds = bounds
     
     def update(self, dt):
         self.rect.x += self.direction * self.speed * dt
+        if not self.bounds.colliderect(self.rect):
+            self.kill()
 
-class Fire(Sprite):
+class Fire(Poolable, Sprite):
     def __init__(self, surf, pos, groups, player):
         super().__init__(pos, surf, groups)
+        self.timer = Timer(100, func = self.kill)
+        self.y_offset = 8
+        self.reset(surf, pos, groups, player)
+
+    def reset(self, surf, pos, groups, player):
+        self.image = surf
+        self.rect = self.image.get_frect(topleft = pos)
+        self.add(groups)
         self.player = player 
         self.flip = player.flip
-        self.timer = Timer(100, autostart = True, func = self.kill)
-        self.y_offset = pygame.Vector2(0,8)
+        self.timer.activate()
         if self.player.flip:
-            self.rect.midright = self.player.rect.midleft + self.y_offset
-            self.image = pygame.transform.flip(self.image, True, False)
-        else:
-            self.rect.midleft = self.player.rect.midright + self.y_offset
-
-    def update(self, _):
-        self.timer.update()
+            self.image = surface_cache.get(self.image, flip_x = True)
+        self.follow()
 
+    def follow(self):
+        # beside the muzzle side of the player, set field by field so no position tuples are built
         if self.player.flip:
-            self.rect.midright = self.player.rect.midleft + self.y_offset
+            self.rect.right = self.player.rect.left
         else:
-            self.rect.midleft = self.player.rect.midright + self.y_offset
+            self.rect.left = self.player.rect.right
+        self.rect.centery = self.player.rect.centery + self.y_offset
+
+    def update(self, _):
+        self.follow()
 
         if self.flip != self.player.flip:
             self.kill()
@@ -50,13 +68,19 @@ class Fire(Sprite):
 class AnimatedSprite(Sprite):
     def __init__(self, frames, pos, groups):
         self.frames, self.frame_index, self.animation_speed = frames, 0, 10
+        self.masks = [surface_cache.get(surf, effect = 'mask') for surf in frames]
         super().__init__(pos, self.frames[self.frame_index], groups)
+        self.mask = self.masks[self.frame_index]
 
     def animate(self, dt):
         self.frame_index += self.animation_speed * dt
-        self.image = self.frames[int(self.frame_index) % len(self.frames)]
+        index = int(self.frame_index) % len(self.frames)
+        self.image = self.frames[index]
+        self.mask = self.masks[index]
 
 class Enemy(AnimatedSprite):
+    lod = True
+
     def __init__(self, frames, pos, groups):
         super().__init__(frames, pos, groups)
         self.death_timer = Timer(200, func = self.kill)
@@ -64,64 +88,92 @@ class Enemy(AnimatedSprite):
     def destroy(self):
         self.death_timer.activate()
         self.animation_speed = 0
-        self.image = pygame.mask.from_surface(self.image).to_surface()
-        self.image.set_colorkey('black')
+        self.image = surface_cache.get(self.image, effect = 'silhouette')
 
     def update(self, dt):
-        self.death_timer.update()
         if not self.death_timer:
             self.move(dt)
             self.animate(dt)
         self.constraint()
 
-class Bee(Enemy):
-    def __init__(self, frames, pos, groups, speed):
+class Bee(Poolable, Enemy):
+    def __init__(self, frames, pos, groups, speed, bounds):
         super().__init__(frames, pos, groups)
+        self.reset(frames, pos, groups, speed, bounds)
+
+    def reset(self, frames, pos, groups, speed, bounds):
+        if frames is not self.frames:
+            self.frames = frames
+            self.masks = [surface_cache.get(surf, effect = 'mask') for surf in frames]
+        self.frame_index, self.animation_speed = 0, 10
+        self.image, self.mask = self.frames[0], self.masks[0]
+        self.rect = self.image.get_frect(topleft = pos)
+        self.death_timer.deactivate()
+        self.add(groups)
+
         self.speed = speed
-        self.amplitude = randint(500,600)
-        self.frequency = randint(300,600)
+        self.amplitude = RNG.randint(500,600)
+        self.frequency = RNG.randint(300,600)
+        self.bounds = bounds
 
     def move(self, dt):
         self.rect.x -= self.speed * dt
-        self.rect.y += sin(pygame.time.get_ticks() / self.frequency) * self.amplitude * dt
+        self.rect.y += sin(get_ticks() / self.frequency) * self.amplitude * dt
     
     def constraint(self):
-        if self.rect.right <= 0:
+        # bees enter from beyond the right edge, so only the left, top and bottom are despawn edges
+        if self.rect.right <= self.bounds.left or self.rect.bottom < self.bounds.top or self.rect.top > self.bounds.bottom:
             self.kill()
 
 class Worm(Enemy):
-    def __init__(self, frames, rect, groups, game):
+    def __init__(self, frames, rect, groups, game, state = None):
         super().__init__(frames, rect.topleft, groups)
+        self.frame_sets = {1: frames, -1: [surface_cache.get(surf, flip_x = True) for surf in frames]}
+        self.mask_sets = {direction: [surface_cache.get(surf, effect = 'mask') for surf in frames] for direction, frames in self.frame_sets.items()}
         self.rect.bottomleft = rect.bottomleft
         self.main_rect = rect
-        self.speed = randint(160,200)
+        self.speed = RNG.randint(160,200) if state is None else state[2]
         self.direction = 1
 
         self.spawn_rect = rect.copy()
         self.game = game
+
+        # woken by the level stream where it went to sleep
+        if state is not None:
+            self.rect.x, self.direction, _, self.frame_index = state
+            self.frames = self.frame_sets[self.direction]
+            self.masks = self.mask_sets[self.direction]
+
+    def sleep(self):
+        return self.rect.x, self.direction, self.speed, self.frame_index
     
     def move(self, dt):
         self.rect.x += self.direction * self.speed * dt
 
     def constraint(self):
-        if not self.main_rect.contains(self.rect):
-            self.direction *= -1
-            self.frames = [pygame.transform.flip(surf, True, False) for surf in self.frames]
+        # turns back from the side it left by and is put back on the edge, a reduced-rate tick
+        # can carry it further out than one step brings back
+        if self.rect.right > self.main_rect.right:
+            self.direction = -1
+            self.rect.right = self.main_rect.right
+        elif self.rect.left < self.main_rect.left:
+            self.direction = 1
+            self.rect.left = self.main_rect.left
+        else:
+            return
+        self.frames = self.frame_sets[self.direction]
+        self.masks = self.mask_sets[self.direction]
 
 class Player(AnimatedSprite):
-    def __init__(self, pos, groups, collision_sprites, character_data, create_bullet, scale = 1.0):
-        def scale_image(image, scale):
-            width = int(image.get_width() * scale)
-            height = int(image.get_height() * scale)
-            return pygame.transform.scale(image, (width, height))
+    def __init__(self, pos, groups, collision_grid, character_data, create_bullet, scale = 1.0):
         self.walk_frames = [
-            scale_image(character_data["walk_a"], scale),
-            scale_image(character_data["walk_b"], scale)
+            surface_cache.get(character_data["walk_a"], scale = scale),
+            surface_cache.get(character_data["walk_b"], scale = scale)
         ]
         super().__init__(self.walk_frames, pos, groups)
         # animation frames
-        self.idle_frame = scale_image(character_data["idle"], scale)
-        self.jump_frame = scale_image(character_data["jump"], scale)
+        self.idle_frame = surface_cache.get(character_data["idle"], scale = scale)
+        self.jump_frame = surface_cache.get(character_data["jump"], scale = scale)
 
         self.image = self.idle_frame
         self.rect = self.image.get_frect(topleft=pos)
@@ -131,24 +183,30 @@ class Player(AnimatedSprite):
 
         # movement
         self.direction = pygame.Vector2()
-        self.collision_sprites = collision_sprites
+        self.collision_grid = collision_grid
         self.speed = 250
-        self.gravity = 50
+        self.gravity = 3000
+        self.jump_speed = 1200
         self.on_floor = False
+        self.actions = 0
+        self.floor_rect = pygame.FRect(0, 0, self.rect.width, 2) # scratch rect for check_floor
 
         self.animation_index = 0
         self.animation_speed = 10
 
         self.shoot_timer = Timer(500)
 
+        # the frame and flip the cached image and mask were looked up for
+        self.base_image = None
+        self.base_flip = None
+
 
     def input(self):
-        keys = pygame.key.get_pressed()
-        self.direction.x = (int(keys[pygame.K_RIGHT]) + int(keys[pygame.K_d])) + (int(keys[pygame.K_LEFT]) - int(keys[pygame.K_a]))
-        if (keys[pygame.K_SPACE] or keys[pygame.K_w] or keys[pygame.K_UP]) and self.on_floor:
-            self.direction.y = -20
+        self.direction.x = bool(self.actions & INPUT_RIGHT) - bool(self.actions & INPUT_LEFT)
+        if self.actions & INPUT_JUMP and self.on_floor:
+            self.direction.y = -self.jump_speed
         
-        if keys[pygame.K_LSHIFT] and not self.shoot_timer:
+        if self.actions & INPUT_SHOOT and not self.shoot_timer:
             self.create_bullet(self.rect.center, -1 if self.flip else 1)
             self.shoot_timer.activate()
 
@@ -159,41 +217,46 @@ class Player(AnimatedSprite):
         
         # vertical 
         self.direction.y += self.gravity * dt
-        self.rect.y += self.direction.y
+        self.rect.y += self.direction.y * dt
         self.collision('vertical')
 
     def collision(self, direction):
-        for sprite in self.collision_sprites:
-            if sprite.rect.colliderect(self.rect):
-                if direction == 'horizontal':
-                    if self.direction.x > 0: self.rect.right = sprite.rect.left
-                    if self.direction.x < 0: self.rect.left = sprite.rect.right
-                if direction == 'vertical':
-                    if self.direction.y > 0: self.rect.bottom = sprite.rect.top
-                    if self.direction.y < 0: self.rect.top = sprite.rect.bottom
-                    self.direction.y = 0
+        for tile_rect in self.collision_grid.overlapping(self.rect):
+            if direction == 'horizontal':
+                if self.direction.x > 0: self.rect.right = tile_rect.left
+                if self.direction.x < 0: self.rect.left = tile_rect.right
+            if direction == 'vertical':
+                if self.direction.y > 0: self.rect.bottom = tile_rect.top
+                if self.direction.y < 0: self.rect.top = tile_rect.bottom
+                self.direction.y = 0
 
     def check_floor(self):
-        bottom_rect = pygame.FRect((0,0), (self.rect.width, 2)).move_to(midtop = self.rect.midbottom)
-        self.on_floor = True if bottom_rect.collidelist([sprite.rect for sprite in self.collision_sprites]) >= 0 else False
+        floor_rect = self.floor_rect
+        floor_rect.width = self.rect.width
+        floor_rect.centerx = self.rect.centerx
+        floor_rect.top = self.rect.bottom
+        self.on_floor = self.collision_grid.collides(floor_rect)
 
     def animate(self, dt):
         if not self.on_floor:
-            self.image = self.jump_frame
+            image = self.jump_frame
         else:
             if self.direction.x != 0:
                 self.animation_index += self.animation_speed * dt
                 frame = int(self.animation_index) % len(self.walk_frames)
-                self.image = self.walk_frames[frame]
+                image = self.walk_frames[frame]
                 self.flip = self.direction.x < 0
             else:
-                self.image = self.idle_frame
+                image = self.idle_frame
 
-        self.image = pygame.transform.flip(self.image, self.flip, False)
+        # most frames show the same image as the last one, skip the cache lookups then
+        if image is not self.base_image or self.flip != self.base_flip:
+            self.base_image, self.base_flip = image, self.flip
+            self.image = surface_cache.get(image, flip_x = self.flip)
+            self.mask = surface_cache.get(self.image, effect = 'mask')
 
 
     def update(self, dt):
-        self.shoot_timer.update()
         self.check_floor()
         self.input()
         self.move(dt)
@@ -1,7 +1,21 @@
 from settings import * 
+from atlas import load_atlas
+from audio import MusicStream
+from threading import Thread, Lock
+
+atlas = None
+
+def atlas_frame(path):
+    global atlas
+    if atlas is None:
+        atlas = load_atlas() or False
+    return atlas.get(path) if atlas else None
 
 def import_image(*path, format = 'png', alpha = True):
     full_path = join(*path) + f'.{format}'
+    frame = atlas_frame(full_path) if alpha else None
+    if frame:
+        return frame
     return pygame.image.load(full_path).convert_alpha() if alpha else pygame.image.load(full_path).convert()
 
 def import_folder(*path):
@@ -9,22 +23,57 @@ def import_folder(*path):
     for folder_path, _, file_names in walk(join(*path)):
         for file_name in sorted(file_names, key = lambda name: int(name.split('.')[0])):
             full_path = join(folder_path, file_name)
-            frames.append(pygame.image.load(full_path).convert_alpha())
+            frames.append(atlas_frame(full_path) or pygame.image.load(full_path).convert_alpha())
     return frames
 
-def audio_importer(*path):
-    audio_dict = {}
+class LazyAssets(dict):
+    # name -> loader; each asset is loaded on first access and kept
+    def __init__(self, loaders):
+        super().__init__()
+        self.loaders = loaders
+        self.lock = Lock()
+
+    def __missing__(self, key):
+        # the preload thread and first use can miss the same key, the lock has it loaded once
+        with self.lock:
+            if not dict.__contains__(self, key):
+                dict.__setitem__(self, key, self.loaders[key]())
+            return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return key in self.loaders
+
+    def get(self, key, default = None):
+        return self[key] if key in self.loaders else default
+
+    def preload(self):
+        # loads everything on a background thread
+        thread = Thread(target = lambda: [self[key] for key in self.loaders], daemon = True)
+        thread.start()
+        return thread
+
+def audio_importer(*path, streamed = STREAMED_AUDIO):
+    # short effects are decoded into Sounds, streamed names only keep their path
+    loaders = {}
     for folder_path, _, file_names in walk(join(*path)):
         for file_name in file_names:
             full_path = join(folder_path, file_name)
-            audio_dict[file_name.split('.')[0]] = pygame.mixer.Sound(full_path)
-    return audio_dict
+            name = file_name.split('.')[0]
+            if name in streamed:
+                loaders[name] = lambda full_path = full_path: MusicStream(full_path)
+            else:
+                loaders[name] = lambda full_path = full_path: pygame.mixer.Sound(full_path)
+    return LazyAssets(loaders)
 
 def load_character(name):
     base_path = join('images', 'player', name)
-    return {
-        "idle": import_image(base_path, 'idle'),
-        "walk_a": import_image(base_path, 'walk_a'),
-        "walk_b": import_image(base_path, 'walk_b'),
-        "jump": import_image(base_path, 'jump')
-    }
+    return LazyAssets({frame: lambda frame = frame: import_image(base_path, frame) for frame in ('idle', 'walk_a', 'walk_b', 'jump')})
+
+def read_keyboard():
+    keys = pygame.key.get_pressed()
+    actions = 0
+    if keys[pygame.K_LEFT] or keys[pygame.K_a]: actions |= INPUT_LEFT
+    if keys[pygame.K_RIGHT] or keys[pygame.K_d]: actions |= INPUT_RIGHT
+    if keys[pygame.K_SPACE] or keys[pygame.K_w] or keys[pygame.K_UP]: actions |= INPUT_JUMP
+    if keys[pygame.K_LSHIFT]: actions |= INPUT_SHOOT
+    return actions
@@ -0,0 +1,128 @@
+from settings import * 
+from timer import get_ticks
+from cache import surface_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class BeeSwarm:
+    # bees as parallel arrays instead of sprites, moved, culled and despawned in one vectorised step per frame
+    def __init__(self, frames, bounds, capacity = 1024, seed = None):
+        self.frames = frames
+        self.masks = [surface_cache.get(surf, effect = 'mask') for surf in frames]
+        self.silhouettes = [surface_cache.get(surf, effect = 'silhouette') for surf in frames]
+        self.width, self.height = frames[0].get_size()
+        self.bounds = bounds
+        self.rng = np.random.default_rng(seed)
+        self.animation_speed = 10
+        self.death_duration = 200
+
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.amplitude = np.zeros(capacity)
+        self.frequency = np.ones(capacity)
+        self.frame_index = np.zeros(capacity)
+        self.death_time = np.full(capacity, -1.0) # -1 while alive, else the tick the bee was hit
+        self.previous_x = np.zeros(capacity)
+        self.previous_y = np.zeros(capacity)
+
+    def arrays(self):
+        return ('x', 'y', 'speed', 'amplitude', 'frequency', 'frame_index', 'death_time', 'previous_x', 'previous_y')
+
+    def grow(self, needed):
+        capacity = max(needed, len(self.x) * 2)
+        for name in self.arrays():
+            old = getattr(self, name)
+            new = np.full(capacity, -1.0) if name == 'death_time' else np.zeros(capacity)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def spawn(self, amount, x, y_range, speed_range):
+        # same draws as Bee: speed and height per bee, amplitude 500-600, frequency 300-600
+        if self.count + amount > len(self.x):
+            self.grow(self.count + amount)
+        new = slice(self.count, self.count + amount)
+        self.x[new] = x
+        self.y[new] = self.rng.integers(y_range[0], y_range[1], amount, endpoint = True)
+        self.speed[new] = self.rng.integers(speed_range[0], speed_range[1], amount, endpoint = True)
+        self.amplitude[new] = self.rng.integers(500, 600, amount, endpoint = True)
+        self.frequency[new] = self.rng.integers(300, 600, amount, endpoint = True)
+        self.frame_index[new] = 0
+        self.death_time[new] = -1
+        self.previous_x[new] = self.x[new]
+        self.previous_y[new] = self.y[new]
+        self.count += amount
+
+    def update(self, dt):
+        n = self.count
+        if not n: return
+        ticks = get_ticks()
+        alive = self.death_time[:n] < 0
+
+        step = np.where(alive, dt, 0)
+        self.previous_x[:n] = self.x[:n]
+        self.previous_y[:n] = self.y[:n]
+        self.x[:n] -= self.speed[:n] * step
+        self.y[:n] += np.sin(ticks / self.frequency[:n]) * self.amplitude[:n] * step
+        self.frame_index[:n] += self.animation_speed * step
+
+        # despawn by compacting the survivors to the front of every array
+        keep = (self.x[:n] + self.width > self.bounds.left) & (self.y[:n] + self.height >= self.bounds.top) & (self.y[:n] <= self.bounds.bottom)
+        keep &= alive | (ticks - self.death_time[:n] < self.death_duration)
+        if not keep.all():
+            survivors = np.flatnonzero(keep)
+            for name in self.arrays():
+                array = getattr(self, name)
+                array[:len(survivors)] = array[survivors]
+            self.count = len(survivors)
+
+    def frame(self, index):
+        frame = int(self.frame_index[index]) % len(self.frames)
+        return (self.frames if self.death_time[index] < 0 else self.silhouettes)[frame], self.masks[frame]
+
+    def overlapping(self, rect, alpha = 1.0):
+        x, y = self.positions(slice(0, self.count), alpha)
+        hits = (x < rect.right) & (x + self.width > rect.left) & (y < rect.bottom) & (y + self.height > rect.top)
+        return np.flatnonzero(hits)
+
+    def collide_mask(self, sprite):
+        # indices of bees whose mask overlaps the sprite's, offsets computed the way pygame.sprite.collide_mask does
+        hits = []
+        for index in self.overlapping(sprite.rect):
+            offset = (int(self.x[index] - sprite.rect.x), int(self.y[index] - sprite.rect.y))
+            if sprite.mask.overlap(self.frame(index)[1], offset):
+                hits.append(index)
+        return hits
+
+    def destroy(self, indices):
+        self.death_time[indices] = get_ticks()
+
+    def positions(self, indices, alpha):
+        # positions between the previous and current update
+        x, y = self.x[indices], self.y[indices]
+        if alpha < 1:
+            x = self.previous_x[indices] + (x - self.previous_x[indices]) * alpha
+            y = self.previous_y[indices] + (y - self.previous_y[indices]) * alpha
+        return x, y
+
+    def screen_rects(self, offset, view, alpha = 1.0):
+        # visible bees keyed by their position in the arrays, padded like AllSprites.screen_rect
+        visible = self.overlapping(view, alpha)
+        x, y = self.positions(visible, alpha)
+        xs = np.floor(x + offset.x).astype(int).tolist()
+        ys = np.floor(y + offset.y).astype(int).tolist()
+        return {(self, index): pygame.Rect(x - 1, y - 1, self.width + 3, self.height + 3) for index, x, y in zip(visible.tolist(), xs, ys)}
+
+    def draw(self, surface, offset, view, alpha = 1.0):
+        visible = self.overlapping(view, alpha)
+        frames = (self.frame_index[visible].astype(int) % len(self.frames)).tolist()
+        dying = (self.death_time[visible] >= 0).tolist()
+        x, y = self.positions(visible, alpha)
+        xs = (x + offset.x).tolist()
+        ys = (y + offset.y).tolist()
+        frame_sets = (self.frames, self.silhouettes)
+        surface.fblits([(frame_sets[dead][frame], (x, y)) for frame, dead, x, y in zip(frames, dying, xs, ys)])
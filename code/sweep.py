@@ -0,0 +1,106 @@
+# plays many headless episodes across a process pool, sweeping spawn rate and player movement
+# usage: python code/sweep.py [--repeats n] [--workers n] [--bee-interval 500,1000] [--speed 200,250] [--gravity 3000] [--csv out.csv]
+from os import environ, cpu_count
+from argparse import ArgumentParser
+from itertools import product
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from struct import pack_into, iter_unpack
+from time import perf_counter
+
+environ['PLATFORMER_HEADLESS'] = '1'
+
+from settings import *
+
+# one row of float64s per episode in the shared results block
+METRICS = ('survival', 'kills', 'frames', 'step_ms')
+ROW = '<' + 'd' * len(METRICS)
+ROW_SIZE = 8 * len(METRICS)
+
+# per worker process: its game, the episode table and the shared results
+worker = {}
+
+def start_worker(episodes, memory_name, max_frames):
+    from main import Game
+    worker['game'] = Game(headless = True)
+    worker['episodes'] = episodes
+    worker['memory'] = SharedMemory(name = memory_name)
+    worker['max_frames'] = max_frames
+
+def play_episode(index):
+    # steps one episode to game over or the frame limit and writes its metrics row, nothing else goes back through the pipe
+    from headless import random_policy
+    game = worker['game']
+    seed, bee_interval, speed, gravity = worker['episodes'][index]
+
+    game.setup(seed = seed)
+    game.state = 'game'
+    game.bee_timer.duration = bee_interval
+    game.bee_timer.activate()
+    game.player.speed = speed
+    game.player.gravity = gravity
+
+    policy = random_policy(seed)
+    dt = 1 / PHYSICS_RATE
+    frames = 0
+    start = perf_counter()
+    while frames < worker['max_frames']:
+        frames += 1
+        if game.step(policy(frames), dt) != 'game':
+            break
+    elapsed = perf_counter() - start
+    pack_into(ROW, worker['memory'].buf, index * ROW_SIZE, frames * dt, game.kills, frames, elapsed * 1000 / frames)
+    return index
+
+def sweep(episodes, workers = None, max_frames = 60 * 60, chunksize = 4):
+    # episodes is a list of (seed, bee interval ms, player speed, player gravity), returns one metrics tuple per episode
+    memory = SharedMemory(create = True, size = max(len(episodes) * ROW_SIZE, 1))
+    try:
+        # spawned workers start from a clean interpreter instead of a forked copy of an initialised SDL
+        with get_context('spawn').Pool(workers or cpu_count(), start_worker, (episodes, memory.name, max_frames)) as pool:
+            for _ in pool.imap_unordered(play_episode, range(len(episodes)), chunksize = chunksize):
+                pass
+            # SDL turns SIGTERM into a quit event, so workers are let exit rather than terminated
+            pool.close()
+            pool.join()
+        return list(iter_unpack(ROW, bytes(memory.buf[:len(episodes) * ROW_SIZE])))
+    finally:
+        memory.close()
+        memory.unlink()
+
+def values(text, kind = int):
+    return [kind(value) for value in text.split(',')]
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--repeats', type = int, default = 20, help = 'seeded episodes per parameter combination')
+    parser.add_argument('--workers', type = int, default = cpu_count())
+    parser.add_argument('--frames', type = int, default = 60 * 60, help = 'episode length limit in physics steps')
+    parser.add_argument('--bee-interval', type = values, default = [500, 1000, 2000], help = 'ms between bee spawns')
+    parser.add_argument('--speed', type = values, default = [250])
+    parser.add_argument('--gravity', type = values, default = [3000])
+    parser.add_argument('--csv')
+    args = parser.parse_args()
+
+    combinations = list(product(args.bee_interval, args.speed, args.gravity))
+    episodes = [(seed, *combination) for combination in combinations for seed in range(args.repeats)]
+
+    start = perf_counter()
+    results = sweep(episodes, args.workers, args.frames)
+    elapsed = perf_counter() - start
+    frames = sum(row[2] for row in results)
+    print(f'{len(episodes)} episodes on {args.workers} workers in {elapsed:.1f}s: {len(episodes) / elapsed:.1f} episodes/s, {frames / elapsed:.0f} steps/s')
+
+    print('bee ms  speed  gravity   survival    kills  step ms')
+    for number, (bee_interval, speed, gravity) in enumerate(combinations):
+        rows = results[number * args.repeats:(number + 1) * args.repeats]
+        means = [sum(column) / len(rows) for column in zip(*rows)]
+        print(f'{bee_interval:>6} {speed:>6} {gravity:>8} {means[0]:9.1f}s {means[1]:8.1f} {means[3]:8.3f}')
+
+    if args.csv:
+        import csv
+        with open(args.csv, 'w', newline = '') as file:
+            writer = csv.writer(file)
+            writer.writerow(('seed', 'bee_interval', 'speed', 'gravity') + METRICS)
+            for episode, row in zip(episodes, results):
+                writer.writerow(episode + row)
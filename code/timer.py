@@ -1,12 +1,92 @@
 from settings import * 
+from heapq import heappush, heappop, heapify
+from itertools import count
+
+class VirtualClock:
+    __slots__ = ('ticks',)
+
+    def __init__(self, start = 0):
+        self.ticks = start
+
+    def advance(self, ms):
+        self.ticks += ms
+
+    def __call__(self):
+        return int(self.ticks)
+
+class Scheduler:
+    # min-heap of timer deadlines, driven by one clock read per update
+    def __init__(self, clock = pygame.time.get_ticks):
+        self.heap = []
+        self.order = count()
+        self.cancelled = 0
+        self.paused_at = None
+        self.set_clock(clock)
+
+    def set_clock(self, clock):
+        # a new clock starts a new timeline, so pending deadlines from the old one are dropped
+        self.clock = clock
+        self.now = clock()
+        self.heap.clear()
+        self.cancelled = 0
+        self.paused_at = None
+
+    def schedule(self, deadline, timer):
+        entry = [deadline, next(self.order), timer]
+        heappush(self.heap, entry)
+        return entry
+
+    def cancel(self, entry):
+        entry[2] = None
+        self.cancelled += 1
+        if self.cancelled > 64 and self.cancelled > len(self.heap) // 2:
+            self.heap = [entry for entry in self.heap if entry[2] is not None]
+            heapify(self.heap)
+            self.cancelled = 0
+
+    def pause(self):
+        if self.paused_at is None:
+            self.paused_at = self.clock()
+
+    def resume(self):
+        if self.paused_at is not None:
+            # shifting every deadline by the same amount keeps the heap ordered
+            shift = self.clock() - self.paused_at
+            for entry in self.heap:
+                entry[0] += shift
+            self.paused_at = None
+
+    def update(self):
+        if self.paused_at is not None:
+            return
+        self.now = self.clock()
+        while self.heap and self.heap[0][0] <= self.now:
+            _, _, timer = heappop(self.heap)
+            if timer is None:
+                self.cancelled -= 1
+            else:
+                timer.expire()
+
+scheduler = Scheduler()
+
+def get_ticks():
+    return scheduler.now
+
+def set_clock(clock):
+    scheduler.set_clock(clock)
 
 class Timer:
-    def __init__(self, duration, func = None, repeat = None, autostart = False):
+    # every enemy, bullet flash and the player own one, so instances skip the attribute dict
+    __slots__ = ('duration', 'start_time', 'active', 'func', 'repeat', 'scheduler', 'entry')
+
+    def __init__(self, duration, func = None, repeat = None, autostart = False, scheduler = scheduler):
         self.duration = duration
         self.start_time = 0
         self.active = False
         self.func = func
         self.repeat = repeat
+        self.scheduler = scheduler
+        self.entry = None
 
         if autostart:
             self.activate()
@@ -15,17 +95,27 @@ class Timer:
         return self.active
 
     def activate(self):
+        if self.entry:
+            self.scheduler.cancel(self.entry)
         self.active = True
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = self.scheduler.now
+        self.entry = self.scheduler.schedule(self.start_time + self.duration, self)
 
     def deactivate(self):
+        if self.entry:
+            self.scheduler.cancel(self.entry)
+            self.entry = None
         self.active = False
         self.start_time = 0
         if self.repeat:
             self.activate()
 
+    def expire(self):
+        self.entry = None
+        if self.func:
+            self.func()
+        self.deactivate()
+
     def update(self):
-        if pygame.time.get_ticks() - self.start_time >= self.duration:
-            if self.func and self.start_time != 0:
-                self.func()
-            self.deactivate()
\ No newline at end of file
+        # expiry is driven by the scheduler; kept so existing callers still work
+        pass
@@ -0,0 +1,31 @@
+from settings import * 
+
+class UILayer:
+    # a retained screen: composed once, then blitted until its key (hover, selection, size...) changes
+    def __init__(self):
+        self.surface = None
+        self.key = None
+        self.texts = {}
+        self.dirty_mode = False
+
+    def text(self, font, text, color):
+        key = (font, text, str(color))
+        if key not in self.texts:
+            self.texts[key] = font.render(text, True, color)
+        return self.texts[key]
+
+    def invalidate(self):
+        self.key = None
+
+    def draw(self, target, key, compose):
+        # returns None when the screen was recomposed, in dirty rect mode an unchanged screen is left alone
+        key = (key, target.get_size())
+        if key != self.key:
+            compose()
+            self.surface = target.copy()
+            self.key = key
+            return None
+        if self.dirty_mode:
+            return []
+        target.blit(self.surface, (0, 0))
+        return None